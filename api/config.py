@@ -54,6 +54,16 @@ class Config:
     # Default AI provider (options: 'gemini', 'groq', 'together', 'openrouter', 'anthropic', 'mock')
     DEFAULT_AI_PROVIDER = os.environ.get('DEFAULT_AI_PROVIDER', 'openrouter')
     
+    # Send each request to two configured providers at once and keep the first
+    # usable answer. Lowers tail latency but roughly doubles token spend.
+    RACE_PROVIDERS = os.environ.get('RACE_PROVIDERS', 'False').lower() == 'true'
+    
+    # Requests that don't name a provider and whose requirements are estimated at
+    # more than LARGE_PROMPT_TOKENS go to LARGE_PROMPT_PROVIDER (e.g. a long-context
+    # paid model) instead of DEFAULT_AI_PROVIDER. Unset keeps everything on the default.
+    LARGE_PROMPT_PROVIDER = os.environ.get('LARGE_PROMPT_PROVIDER', '')
+    LARGE_PROMPT_TOKENS = int(os.environ.get('LARGE_PROMPT_TOKENS', '8000'))
+    
     # File upload settings
     # use /tmp for serverless environments (Vercel)
     if os.environ.get('VERCEL'):
@@ -62,7 +72,7 @@ class Config:
         UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
         
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
-    ALLOWED_EXTENSIONS = {'pdf', 'docx', 'txt'}
+    ALLOWED_EXTENSIONS = frozenset({'pdf', 'docx', 'txt'})
     
     # Token settings
     TOKEN_EXPIRY_HOURS = 24
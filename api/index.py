@@ -1,80 +1,313 @@
 import os
 import secrets
+import hashlib
+import time
 import bcrypt
-from datetime import datetime, timedelta
-from flask import Flask, jsonify, request
-from flask_cors import CORS
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, abort, g, request
 
 # Optional Supabase import
 try:
     from supabase import create_client, Client
+    from supabase.lib.client_options import ClientOptions
     SUPABASE_AVAILABLE = True
 except ImportError:
     SUPABASE_AVAILABLE = False
     print("Warning: Supabase library not found. Falling back to in-memory mode.")
 
+# Optional Argon2 import (bcrypt is kept for existing hashes)
+try:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import VerifyMismatchError, InvalidHashError
+    ARGON2_AVAILABLE = True
+except ImportError:
+    ARGON2_AVAILABLE = False
+    print("Warning: argon2-cffi not found. Falling back to bcrypt for new hashes.")
+
+# AI service, imported and constructed once per container instead of per request
+try:
+    from services.ai_service import AIService
+    _ai_service = AIService()
+    AI_SERVICE_AVAILABLE = True
+    _ai_service_error = None
+except Exception as e:
+    _ai_service = None
+    AI_SERVICE_AVAILABLE = False
+    _ai_service_error = str(e)
+    print(f"Warning: AI service failed to initialize: {e}")
+
+# Optional orjson import (faster JSON responses, emits bytes directly)
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+except ImportError:
+    import json
+    def _json_dumps(obj):
+        return json.dumps(obj).encode('utf-8')
+
+# Optional Redis import (sessions shared across serverless instances)
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', secrets.token_hex(32))
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # requirements text for /api/generate
+
+# signup/login bodies are a few short fields; anything bigger is rejected before parsing
+AUTH_MAX_CONTENT_LENGTH = 4096
+_AUTH_ENDPOINTS = frozenset({'signup', 'login'})
+
+# CORS: the API is open to all origins, so the headers are static
+_CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Authorization,Content-Type',
+    'Access-Control-Allow-Methods': 'GET,POST,OPTIONS',
+}
+
+@app.before_request
+def _cors_preflight():
+    if request.method == 'OPTIONS':
+        return Response(status=204)
+
+@app.before_request
+def _limit_auth_payload():
+    if request.endpoint in _AUTH_ENDPOINTS and (request.content_length or 0) > AUTH_MAX_CONTENT_LENGTH:
+        abort(413)
 
-# Enable CORS
-CORS(app, resources={r"/*": {"origins": "*"}})
+@app.errorhandler(413)
+def payload_too_large(error):
+    return ojson({'error': 'Request body too large'}, 413)
 
-# Global DB client
+@app.after_request
+def _cors_headers(resp):
+    resp.headers.update(_CORS_HEADERS)
+    return resp
+
+# bcrypt work factor, read once at import so operators can tune it per deployment
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+
+# Session lifetime in seconds; expiry is stored as an int unix timestamp
+SESSION_TTL_SECONDS = 24 * 60 * 60
+
+# How long a Redis session may be served from the local cache. Kept well below
+# the session TTL; the session's own expiry is still enforced on every hit.
+SESSION_CACHE_TTL_SECONDS = 60
+SESSION_CACHE_MAX = 10000
+
+# Expired in-memory sessions are swept every this many logins/signups
+SESSION_SWEEP_INTERVAL = 1024
+
+# Argon2id hasher for new passwords; hashes are self-describing ($argon2id$...)
+_ph = PasswordHasher(time_cost=3, memory_cost=65536, parallelism=2) if ARGON2_AVAILABLE else None
+
+# Password hashing pool. bcrypt and argon2-cffi release the GIL, so hashes run in
+# parallel across cores; capping workers at the CPU count keeps a login burst from
+# oversubscribing the CPU (and, for Argon2, from allocating 64 MiB per request).
+_hash_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='pwhash')
+
+# Global DB client, created once at import so a warm container reuses its HTTP connections
 supabase = None
+if SUPABASE_AVAILABLE:
+    _supabase_url = os.environ.get("SUPABASE_URL")
+    _supabase_key = os.environ.get("SUPABASE_KEY")
+    if _supabase_url and _supabase_key:
+        try:
+            supabase = create_client(
+                _supabase_url,
+                _supabase_key,
+                options=ClientOptions(postgrest_client_timeout=10, schema='public')
+            )
+        except Exception as e:
+            print(f"Supabase init failed: {e}")
+            supabase = None
+
+# Redis session store, built once at import so warm invocations reuse the pool.
+# Vercel KV exposes its Redis connection string as KV_URL.
+redis_client = None
+REDIS_URL = os.environ.get('REDIS_URL') or os.environ.get('KV_URL')
+if REDIS_AVAILABLE and REDIS_URL:
+    try:
+        _redis_pool = redis.ConnectionPool.from_url(REDIS_URL, decode_responses=True)
+        redis_client = redis.Redis(connection_pool=_redis_pool)
+    except Exception as e:
+        print(f"Redis init failed: {e}. Falling back to in-memory sessions.")
+        redis_client = None
+
+# In-memory session record; expires_at is an int unix timestamp
+Session = namedtuple('Session', 'email expires_at')
 
 # In-memory fallbacks
 users_memory = {}
-sessions_store = {}
+sessions_store = {}  # {blake2b(token): Session} - used when Redis is not configured
+_session_cache = {}  # {blake2b(token): (cached_until, Session)} - local tier in front of Redis
+_session_inserts = 0
+
+# Per-second memo of validated sessions: {blake2b(token): email}. Only entries from
+# the current wall-clock second are valid, so the whole dict is reset when it rolls.
+_validated = {}
+_validated_second = 0
 
 def get_db():
-    global supabase
-    if not SUPABASE_AVAILABLE:
-        return None
-        
-    if not supabase:
-        url = os.environ.get("SUPABASE_URL")
-        key = os.environ.get("SUPABASE_KEY")
-        if url and key:
-            try:
-                supabase = create_client(url, key)
-            except Exception as e:
-                print(f"Supabase init failed: {e}")
-                return None
     return supabase
 
+def ojson(obj, status=200):
+    """Build a JSON response, serialized with orjson when available."""
+    return Response(_json_dumps(obj), status=status, mimetype='application/json')
+
+def _hash_password_sync(password):
+    if _ph:
+        return _ph.hash(password)
+    pw_bytes = password.encode('utf-8')
+    return bcrypt.hashpw(pw_bytes, bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
+
+def _verify_password_sync(password, password_hash):
+    if password_hash.startswith('$argon2'):
+        if not _ph:
+            return False
+        try:
+            return _ph.verify(password_hash, password)
+        except (VerifyMismatchError, InvalidHashError):
+            return False
+    pw_bytes = password.encode('utf-8')
+    return bcrypt.checkpw(pw_bytes, password_hash.encode('utf-8'))
+
 def hash_password(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return _hash_pool.submit(_hash_password_sync, password).result()
 
 def verify_password(password, password_hash):
-    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    return _hash_pool.submit(_verify_password_sync, password, password_hash).result()
+
+# Verified against when the account does not exist, so a missing user costs the
+# same hashing time as a wrong password and emails can't be probed by timing.
+_DUMMY_HASH = _hash_password_sync('dummy-password')
+
+def password_needs_rehash(password_hash):
+    """True for legacy bcrypt hashes or Argon2 hashes with outdated parameters."""
+    if not _ph:
+        return False
+    if not password_hash.startswith('$argon2'):
+        return True
+    return _ph.check_needs_rehash(password_hash)
+
+def _session_key(token):
+    """Digest a bearer token so dict lookup timing is independent of the token's bytes."""
+    return hashlib.blake2b(token.encode('utf-8'), digest_size=16).hexdigest()
+
+def _load_session(key):
+    """Return the live Session for a digested token, or None."""
+    now = time.time()
+    if redis_client:
+        cached = _session_cache.get(key)
+        if cached and cached[0] > now:
+            # Never trust the cache past the session's real expiry
+            return cached[1] if cached[1].expires_at >= now else None
+        
+        # Value is "<expires_at>|<email>"; Redis also enforces the TTL server-side
+        value = redis_client.get(f'sess:{key}')
+        if not value:
+            _session_cache.pop(key, None)
+            return None
+        expires_at, email = value.split('|', 1)
+        session_data = Session(email, int(expires_at))
+        if session_data.expires_at < now:
+            return None
+        if len(_session_cache) >= SESSION_CACHE_MAX:
+            _session_cache.clear()
+        _session_cache[key] = (now + SESSION_CACHE_TTL_SECONDS, session_data)
+        return session_data
+    
+    session_data = sessions_store.get(key)
+    if not session_data or session_data.expires_at < now:
+        return None
+    return session_data
+
+def _drop_session(key):
+    _validated.pop(key, None)
+    if redis_client:
+        _session_cache.pop(key, None)
+        redis_client.delete(f'sess:{key}')
+    else:
+        sessions_store.pop(key, None)
+
+def _sweep_expired_sessions():
+    """Drop expired in-memory sessions.
+
+    Every session gets the same TTL, so dict insertion order is expiry order:
+    pop from the front until the first live session.
+    """
+    now = time.time()
+    while sessions_store:
+        oldest = next(iter(sessions_store))
+        if sessions_store[oldest].expires_at >= now:
+            break
+        del sessions_store[oldest]
 
 def create_session_token(email):
-    token = secrets.token_hex(32)
-    expires_at = datetime.now() + timedelta(hours=24)
-    sessions_store[token] = {'user_email': email, 'expires_at': expires_at}
+    global _session_inserts
+    token = secrets.token_urlsafe(32)
+    key = _session_key(token)
+    expires_at = int(time.time()) + SESSION_TTL_SECONDS
+    if redis_client:
+        redis_client.setex(f'sess:{key}', SESSION_TTL_SECONDS, f'{expires_at}|{email}')
+    else:
+        sessions_store[key] = Session(email, expires_at)
+        _session_inserts += 1
+        if _session_inserts % SESSION_SWEEP_INTERVAL == 0:
+            _sweep_expired_sessions()
     return token
 
-def get_current_user():
+def _bearer():
+    """Return the request's bearer token ('' if absent), parsed once per request."""
+    token = getattr(g, '_bearer', None)
+    if token is not None:
+        return token
     auth_header = request.headers.get('Authorization', '')
-    if not auth_header.startswith('Bearer '):
+    g._bearer = auth_header[7:] if auth_header.startswith('Bearer ') else ''
+    return g._bearer
+
+def get_current_user():
+    global _validated_second
+    token = _bearer()
+    if not token:
         return None
     
-    token = auth_header[7:]
-    session_data = sessions_store.get(token)
+    key = _session_key(token)
+    now_s = int(time.time())
+    if now_s != _validated_second:
+        _validated.clear()
+        _validated_second = now_s
+    email = _validated.get(key)
+    if email:
+        return {'email': email}
+    
+    session_data = _load_session(key)
     
-    if not session_data or session_data['expires_at'] < datetime.now():
+    if not session_data:
         return None
     
-    return {'email': session_data['user_email']}
+    _validated[key] = session_data.email
+    return {'email': session_data.email}
+
+# Static response bodies, encoded once at import. The DB client is fixed at
+# import time too, so the index body never changes for the process lifetime.
+_INDEX_BODY = _json_dumps({
+    'status': 'success',
+    'message': f'Smart QA Backend is Running. Mode: {"Connected" if supabase else "Memory Mode (No DB)"}'
+})
+_UNAUTHORIZED_BODY = _json_dumps({'error': 'Unauthorized'})
+_LOGOUT_BODY = _json_dumps({'message': 'Logged out successfully'})
 
 @app.route('/')
 @app.route('/api')
 def index():
-    db_status = "Connected" if get_db() else "Memory Mode (No DB)"
-    return jsonify({
-        'status': 'success', 
-        'message': f'Smart QA Backend is Running. Mode: {db_status}'
-    }), 200
+    return Response(_INDEX_BODY, status=200, mimetype='application/json')
+
+# PostgREST / Postgres error codes for a function that does not exist (schema.sql not run)
+_MISSING_FUNCTION_CODES = ('PGRST202', '42883')
 
 @app.route('/api/signup', methods=['POST'])
 def signup():
@@ -85,35 +318,39 @@ def signup():
         password = data.get('password', '')
         
         if not name or not email or not password:
-            return jsonify({'error': 'All fields are required'}), 400
+            return ojson({'error': 'All fields are required'}, 400)
             
         hashed = hash_password(password)
         db = get_db()
         
         if db:
-            # Use Supabase
+            # Use Supabase: create_user (api/schema.sql) returns NULL on duplicate email
             try:
-                res = db.table('users').insert({
-                    'name': name,
-                    'email': email,
-                    'password_hash': hashed,
-                    'created_at': datetime.now().isoformat()
+                res = db.rpc('create_user', {
+                    'p_name': name,
+                    'p_email': email,
+                    'p_password_hash': hashed
                 }).execute()
             except Exception as e:
-                return jsonify({'error': 'Email likely already exists or DB error'}), 409
+                if getattr(e, 'code', None) in _MISSING_FUNCTION_CODES:
+                    print("Signup error: create_user() is missing; run api/schema.sql in the Supabase SQL editor")
+                    return ojson({'error': 'Signup is temporarily unavailable'}, 500)
+                raise
+            if not res.data:
+                return ojson({'error': 'Email already registered'}, 409)
         else:
             # Fallback to Memory
             if email in users_memory:
-                 return jsonify({'error': 'Email already registered'}), 409
+                 return ojson({'error': 'Email already registered'}, 409)
             users_memory[email] = {
                 'name': name, 'email': email, 'password_hash': hashed
             }
 
         token = create_session_token(email)
-        return jsonify({'message': 'Account created', 'token': token, 'user': {'name': name, 'email': email}}), 201
+        return ojson({'message': 'Account created', 'token': token, 'user': {'name': name, 'email': email}}, 201)
 
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}, 500)
 
 @app.route('/api/login', methods=['POST'])
 def login():
@@ -127,62 +364,75 @@ def login():
         
         if db:
             # Use Supabase
-            res = db.table('users').select("*").eq('email', email).execute()
+            res = db.table('users').select('name,password_hash').eq('email', email).limit(1).execute()
             if res.data:
                 user = res.data[0]
         else:
             # Fallback Memory
             user = users_memory.get(email)
             
-        if not user or not verify_password(password, user['password_hash']):
-            return jsonify({'error': 'Invalid credentials'}), 401
+        if not user:
+            verify_password(password, _DUMMY_HASH)
+            return ojson({'error': 'Invalid credentials'}, 401)
+        if not verify_password(password, user['password_hash']):
+            return ojson({'error': 'Invalid credentials'}, 401)
+        
+        # Upgrade legacy bcrypt / outdated Argon2 hashes on successful login
+        if password_needs_rehash(user['password_hash']):
+            new_hash = hash_password(password)
+            if db:
+                try:
+                    db.table('users').update({'password_hash': new_hash}).eq('email', email).execute()
+                except Exception as e:
+                    print(f"Password rehash failed: {e}")
+            else:
+                user['password_hash'] = new_hash
             
         token = create_session_token(email)
-        return jsonify({
+        return ojson({
             'message': 'Login successful',
             'token': token,
             'user': {'name': user.get('name'), 'email': email}
-        }), 200
+        }, 200)
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}, 500)
 
 @app.route('/api/logout', methods=['POST'])
 def logout():
-    auth_header = request.headers.get('Authorization', '')
-    if auth_header.startswith('Bearer '):
-        token = auth_header[7:]
-        sessions_store.pop(token, None)
-    return jsonify({'message': 'Logged out successfully'}), 200
+    token = _bearer()
+    if token:
+        _drop_session(_session_key(token))
+    return Response(_LOGOUT_BODY, status=200, mimetype='application/json')
 
 @app.route('/api/me', methods=['GET'])
 def get_me():
     user = get_current_user()
     if not user:
-        return jsonify({'error': 'Unauthorized'}), 401
-    return jsonify({'user': user}), 200
+        return Response(_UNAUTHORIZED_BODY, status=401, mimetype='application/json')
+    return ojson({'user': user}, 200)
 
 @app.route('/api/history', methods=['GET'])
 def get_history():
     user = get_current_user()
     if not user:
-        return jsonify({'error': 'Unauthorized'}), 401
-    return jsonify({'history': []}), 200
+        return Response(_UNAUTHORIZED_BODY, status=401, mimetype='application/json')
+    return ojson({'history': []}, 200)
 
 @app.route('/api/providers', methods=['GET'])
 def get_providers():
+    if not AI_SERVICE_AVAILABLE:
+        return ojson({'providers': [{'id': 'mock', 'name': 'Demo Mode', 'description': _ai_service_error}], 'default': 'mock'}, 200)
     try:
-        from services.ai_service import AIService
-        service = AIService()
-        return jsonify({'providers': service.get_available_providers(), 'default': 'mock'}), 200
+        return ojson({'providers': _ai_service.get_available_providers(), 'default': 'mock'}, 200)
     except Exception as e:
-        return jsonify({'providers': [{'id': 'mock', 'name': 'Demo Mode', 'description': str(e)}], 'default': 'mock'}), 200
+        return ojson({'providers': [{'id': 'mock', 'name': 'Demo Mode', 'description': str(e)}], 'default': 'mock'}, 200)
 
 @app.route('/api/generate', methods=['POST'])
 def generate():
     user = get_current_user()
     if not user:
-        return jsonify({'error': 'Unauthorized'}), 401
+        return Response(_UNAUTHORIZED_BODY, status=401, mimetype='application/json')
     
     try:
         data = request.get_json() or {}
@@ -191,20 +441,28 @@ def generate():
         ai_provider = data.get('ai_provider', None)
         
         if not requirements:
-            return jsonify({'error': 'Requirements are required'}), 400
+            return ojson({'error': 'Requirements are required'}, 400)
         
-        # Use AI service
-        from services.ai_service import AIService
-        service = AIService()
-        result = service.generate_test_cases(requirements, project_type, ai_provider)
+        if not AI_SERVICE_AVAILABLE:
+            return ojson({'error': 'AI Service failed to initialize'}, 500)
         
-        return jsonify({
+        result = _ai_service.generate_test_cases(requirements, project_type, ai_provider)
+        
+        return ojson({
             'success': True,
             'test_cases': result.get('test_cases', []),
             'summary': result.get('summary', {}),
             'provider': result.get('provider', 'unknown'),
             'note': result.get('note', '')
-        }), 200
+        }, 200)
     except Exception as e:
         print(f"Generation error: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}, 500)
+
+
+# ASGI entry point for hypercorn/uvicorn deployments (Vercel serves `app` as WSGI)
+try:
+    from asgiref.wsgi import WsgiToAsgi
+    asgi_app = WsgiToAsgi(app)
+except ImportError:
+    asgi_app = None
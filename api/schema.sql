@@ -0,0 +1,24 @@
+-- Supabase schema helpers for the api/ deployment.
+-- Run once in the Supabase SQL editor.
+
+-- Insert a user unless the email is taken. Returns the new id, or NULL on a
+-- duplicate email, so signup is a single round-trip with no exception path.
+create or replace function create_user(p_name text, p_email text, p_password_hash text)
+returns uuid
+language plpgsql
+as $$
+declare
+    new_id uuid;
+begin
+    insert into users (name, email, password_hash, created_at)
+    values (p_name, p_email, p_password_hash, now())
+    on conflict (email) do nothing
+    returning id into new_id;
+    return new_id;
+end;
+$$;
+
+-- Login filters on email = $1 (emails are lower-cased before storing), which the
+-- unique index behind ON CONFLICT (email) already serves. An earlier version of this
+-- file added an index on lower(email) that no query used; drop it if present.
+drop index if exists users_email_lower_idx;
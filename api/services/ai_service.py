@@ -1,7 +1,265 @@
 import json
 import re
+import asyncio
+import time
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+from functools import cached_property
 from config import Config
 
+# Optional orjson import (faster parsing of multi-KB model responses)
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# Requirement normalization for the response cache key. Only case and whitespace
+# are folded; punctuation is kept, since ">=" vs "<=" or "1.5" vs "15" change meaning.
+_WHITESPACE_RE = re.compile(r'\s+')
+
+_TOKEN_RE = re.compile(rb'\w+|[^\w\s]')
+
+
+def _approx_tokens_regex(buf: bytes) -> int:
+    """Approximate the tokenizer count of UTF-8 text: words and symbols, plus a third."""
+    count = len(_TOKEN_RE.findall(buf))
+    return count + count // 3
+
+
+def _approx_tokens_kernel(buf):
+    # Same count as _approx_tokens_regex over a uint8 array; compiled with numba when installed
+    count = 0
+    in_word = False
+    for b in buf:
+        if (48 <= b <= 57) or (65 <= b <= 90) or (97 <= b <= 122) or b == 95:
+            if not in_word:
+                count += 1
+                in_word = True
+        else:
+            in_word = False
+            if not (b == 32 or 9 <= b <= 13):
+                count += 1
+    return count + count // 3
+
+
+# The estimator in use. numba/numpy cost hundreds of ms to import, so they are only
+# loaded, on a background thread, after the first estimate; the regex serves until then.
+_approx_tokens = _approx_tokens_regex
+_numba_load_started = False
+_numba_load_lock = threading.Lock()
+
+
+def _load_numba_estimator() -> None:
+    global _approx_tokens
+    try:
+        import numpy as np
+        from numba import njit
+    except ImportError:
+        return
+    try:
+        jitted = njit(cache=True)(_approx_tokens_kernel)
+        
+        def _approx_tokens_numba(buf: bytes) -> int:
+            return int(jitted(np.frombuffer(buf, dtype=np.uint8)))
+        
+        _approx_tokens_numba(b'warm up')  # compile before swapping it in
+        _approx_tokens = _approx_tokens_numba
+    except Exception as e:
+        print(f"numba token estimator unavailable: {e}")
+
+
+def _start_numba_load() -> None:
+    global _numba_load_started
+    with _numba_load_lock:
+        if _numba_load_started:
+            return
+        _numba_load_started = True
+    threading.Thread(target=_load_numba_estimator, daemon=True, name='numba-load').start()
+
+# Static instructions sent ahead of every request, kept separate from the
+# requirements. At roughly 400 tokens this is below Anthropic's 1024-token
+# minimum for a cacheable prefix, so no cache_control breakpoint is set.
+SYSTEM_PROMPT = """You are an expert QA engineer. Generate industry-standard test cases based on the requirements provided by the user.
+
+Generate comprehensive test cases in JSON format. Each test case should include:
+- Test ID (format: TC_XXX)
+- Module (the feature/component being tested)
+- Test Scenario (description of what is being tested)
+- Preconditions (what must be true before the test)
+- Steps (numbered list of test steps)
+- Test Data (sample data to use)
+- Expected Result (what should happen)
+- Actual Result (leave as empty string)
+- Status (leave as "Pending")
+- Priority (High, Medium, or Low)
+- Severity (Critical, Major, Minor, or Trivial)
+- Edge Cases (any edge case considerations)
+
+Return the response as a valid JSON object with this structure:
+{
+    "test_cases": [
+        {
+            "test_id": "TC_001",
+            "module": "...",
+            "test_scenario": "...",
+            "preconditions": "...",
+            "steps": "1. Step one\\n2. Step two\\n3. Step three",
+            "test_data": "...",
+            "expected_result": "...",
+            "actual_result": "",
+            "status": "Pending",
+            "priority": "High|Medium|Low",
+            "severity": "Critical|Major|Minor|Trivial",
+            "edge_cases": "..."
+        }
+    ],
+    "summary": {
+        "total_test_cases": X,
+        "high_priority": X,
+        "medium_priority": X,
+        "low_priority": X
+    }
+}
+
+Generate at least 5-10 comprehensive test cases covering positive, negative, and edge cases.
+IMPORTANT: Return ONLY the JSON object, no additional text or markdown formatting."""
+
+# Fixed pieces of the per-request user prompt; only the two values are concatenated in
+_USER_PROMPT_PREFIX = "Project Type: "
+_USER_PROMPT_REQUIREMENTS = "\n\nRequirements:\n"
+
+
+def _find_json_span(text: str, pos: int = 0):
+    """
+    Find the first balanced {...} object in text at or after pos.
+    
+    A single forward scan that tracks brace depth and skips braces inside
+    string literals, so it is linear in the input and cannot backtrack.
+    
+    Returns:
+        (start, end) indexes of the opening and closing brace, or None
+    """
+    start = text.find('{', pos)
+    if start == -1:
+        return None
+    
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                return start, i
+    return None
+
+
+# Demo-mode test cases. {mod} and {pt} are filled in with the module name and
+# project type; only the fields listed in _MOCK_FORMAT_FIELDS contain them.
+_MOCK_TEMPLATES = (
+    {
+        "test_id": "TC_001",
+        "module": "{mod} - Core Functionality",
+        "test_scenario": "Verify basic functionality works as expected",
+        "preconditions": "System is accessible and user is authenticated",
+        "steps": "1. Navigate to the feature\n2. Perform the primary action\n3. Verify the result",
+        "test_data": "Valid input data",
+        "expected_result": "Action completes successfully with expected output",
+        "actual_result": "",
+        "status": "Pending",
+        "priority": "High",
+        "severity": "Critical",
+        "edge_cases": "Test with minimum and maximum valid inputs"
+    },
+    {
+        "test_id": "TC_002",
+        "module": "{mod} - Input Validation",
+        "test_scenario": "Verify system handles invalid input gracefully",
+        "preconditions": "System is accessible",
+        "steps": "1. Navigate to the input form\n2. Enter invalid data\n3. Submit the form\n4. Verify error handling",
+        "test_data": "Invalid/malformed input data",
+        "expected_result": "System displays appropriate error message",
+        "actual_result": "",
+        "status": "Pending",
+        "priority": "High",
+        "severity": "Major",
+        "edge_cases": "Test with empty inputs, special characters, SQL injection attempts"
+    },
+    {
+        "test_id": "TC_003",
+        "module": "{mod} - Boundary Testing",
+        "test_scenario": "Verify system handles boundary conditions",
+        "preconditions": "System is accessible with valid permissions",
+        "steps": "1. Test with minimum boundary value\n2. Test with maximum boundary value\n3. Test with values just outside boundaries",
+        "test_data": "Boundary values (min, max, min-1, max+1)",
+        "expected_result": "System accepts valid boundary values and rejects invalid ones",
+        "actual_result": "",
+        "status": "Pending",
+        "priority": "Medium",
+        "severity": "Major",
+        "edge_cases": "Consider integer overflow, date boundaries"
+    },
+    {
+        "test_id": "TC_004",
+        "module": "{mod} - Error Handling",
+        "test_scenario": "Verify system error handling and recovery",
+        "preconditions": "System is accessible",
+        "steps": "1. Simulate error condition\n2. Verify error is logged\n3. Verify user-friendly message displayed\n4. Verify system recovery",
+        "test_data": "Conditions that trigger errors",
+        "expected_result": "System handles errors gracefully without crashing",
+        "actual_result": "",
+        "status": "Pending",
+        "priority": "Medium",
+        "severity": "Major",
+        "edge_cases": "Network failures, timeout conditions, server errors"
+    },
+    {
+        "test_id": "TC_005",
+        "module": "{mod} - {pt} Specific",
+        "test_scenario": "Verify {pt}-specific requirements",
+        "preconditions": "{pt} environment is properly configured",
+        "steps": "1. Set up {pt} test environment\n2. Execute {pt}-specific test\n3. Verify results",
+        "test_data": "{pt}-specific test data",
+        "expected_result": "All {pt}-specific requirements are met",
+        "actual_result": "",
+        "status": "Pending",
+        "priority": "High",
+        "severity": "Critical",
+        "edge_cases": "Cross-platform compatibility for {pt}"
+    }
+)
+
+_MOCK_FORMAT_FIELDS = tuple(
+    tuple(key for key, value in template.items() if '{mod}' in value or '{pt}' in value)
+    for template in _MOCK_TEMPLATES
+)
+
+_MOCK_SUMMARY = {
+    "total_test_cases": len(_MOCK_TEMPLATES),
+    "high_priority": 3,
+    "medium_priority": 2,
+    "low_priority": 0
+}
+
+_MOCK_MODULE_NAME_MAX = 50
+
+_MOCK_NOTE = "Demo mode - Configure an AI provider API key for real test case generation"
+
 
 class AIService:
     """Service for interacting with multiple AI providers for test case generation."""
@@ -40,36 +298,125 @@ class AIService:
         }
     }
     
+    # Response cache: identical prompts are not re-sent to paid/rate-limited providers
+    CACHE_MAX_ENTRIES = 1000
+    CACHE_TTL_SECONDS = 24 * 60 * 60
+    
+    # Number of providers queried at once when Config.RACE_PROVIDERS is enabled
+    RACE_WIDTH = 2
+    
     def __init__(self):
-        self.gemini_client = None
-        self.groq_client = None
-        self.anthropic_client = None
-        
-        # Initialize available clients
-        if Config.GOOGLE_API_KEY:
-            try:
-                import google.generativeai as genai
-                genai.configure(api_key=Config.GOOGLE_API_KEY)
-                self.gemini_client = genai.GenerativeModel(Config.GEMINI_MODEL)
-            except Exception as e:
-                print(f"Gemini init error: {e}")
-        
-        if Config.GROQ_API_KEY:
-            try:
-                from groq import Groq
-                self.groq_client = Groq(api_key=Config.GROQ_API_KEY)
-            except Exception as e:
-                print(f"Groq init error: {e}")
-        
-        if Config.ANTHROPIC_API_KEY:
-            try:
-                import anthropic
-                self.anthropic_client = anthropic.Anthropic(api_key=Config.ANTHROPIC_API_KEY)
-            except Exception as e:
-                print(f"Anthropic init error: {e}")
+        self._cache = OrderedDict()  # {key: (expires_at, result)}, least recently used first
+        self._cache_lock = threading.Lock()
+        
+        # Async SDK clients, one set per event loop (their connection pools are loop-bound)
+        self._async_clients = weakref.WeakKeyDictionary()  # {loop: {provider: client}}
+        self._async_lock = threading.Lock()
+        self._loop = None
+        
+        # Configured keys cannot change during the process lifetime
+        self._available = self._compute_available()
+        
+        # Settings read on every request, bound once
+        self._default_provider = Config.DEFAULT_AI_PROVIDER
+        self._race_providers = Config.RACE_PROVIDERS
+        self._large_prompt_provider = Config.LARGE_PROMPT_PROVIDER
+        self._large_prompt_tokens = Config.LARGE_PROMPT_TOKENS
+        self._openrouter_key = Config.OPENROUTER_API_KEY
+        self._groq_key = Config.GROQ_API_KEY
+        self._together_key = Config.TOGETHER_API_KEY
+        self._anthropic_key = Config.ANTHROPIC_API_KEY
+        self._openrouter_model = Config.OPENROUTER_MODEL
+        self._gemini_model = Config.GEMINI_MODEL
+        self._groq_model = Config.GROQ_MODEL
+        self._together_model = Config.TOGETHER_MODEL
+        self._anthropic_model = Config.AI_MODEL
+        self._models = {
+            'openrouter': self._openrouter_model,
+            'gemini': self._gemini_model,
+            'groq': self._groq_model,
+            'together': self._together_model,
+            'anthropic': self._anthropic_model
+        }
+    
+    # Provider SDKs pull in gRPC/protobuf/httpx, so each one is imported and its
+    # client built on first use rather than at construction (matters on cold start).
+    
+    @cached_property
+    def openrouter_client(self):
+        """OpenRouter client (OpenAI-compatible), created on first use; None if not configured."""
+        if not Config.OPENROUTER_API_KEY:
+            return None
+        return self._openai_compatible_client(Config.OPENROUTER_API_KEY, "https://openrouter.ai/api/v1")
+    
+    @cached_property
+    def together_client(self):
+        """Together AI client (OpenAI-compatible), created on first use; None if not configured."""
+        if not Config.TOGETHER_API_KEY:
+            return None
+        return self._openai_compatible_client(Config.TOGETHER_API_KEY, "https://api.together.xyz/v1")
+    
+    def _openai_compatible_client(self, api_key: str, base_url: str):
+        """Build an OpenAI client whose pooled keep-alive connections are reused across requests."""
+        try:
+            import httpx
+            import openai
+            return openai.OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=httpx.Client(
+                    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                    timeout=httpx.Timeout(600.0, connect=5.0)
+                )
+            )
+        except Exception as e:
+            print(f"OpenAI client init error ({base_url}): {e}")
+            return None
+    
+    @cached_property
+    def gemini_client(self):
+        """Gemini model, created on first use; None if not configured."""
+        if not Config.GOOGLE_API_KEY:
+            return None
+        try:
+            import google.generativeai as genai
+            genai.configure(api_key=Config.GOOGLE_API_KEY)
+            return genai.GenerativeModel(Config.GEMINI_MODEL, system_instruction=SYSTEM_PROMPT)
+        except Exception as e:
+            print(f"Gemini init error: {e}")
+            return None
+    
+    @cached_property
+    def groq_client(self):
+        """Groq client, created on first use; None if not configured."""
+        if not Config.GROQ_API_KEY:
+            return None
+        try:
+            from groq import Groq
+            return Groq(api_key=Config.GROQ_API_KEY)
+        except Exception as e:
+            print(f"Groq init error: {e}")
+            return None
+    
+    @cached_property
+    def anthropic_client(self):
+        """Anthropic client, created on first use; None if not configured."""
+        if not Config.ANTHROPIC_API_KEY:
+            return None
+        try:
+            import anthropic
+            return anthropic.Anthropic(api_key=Config.ANTHROPIC_API_KEY)
+        except Exception as e:
+            print(f"Anthropic init error: {e}")
+            return None
     
     def get_available_providers(self) -> list:
         """Get list of available providers."""
+        # Copies, so callers can't mutate the shared list
+        return [dict(provider) for provider in self._available]
+    
+    def _compute_available(self) -> tuple:
+        """Build the provider list from the configured API keys."""
         available = []
         
         # Add all providers regardless of key status
@@ -117,7 +464,7 @@ class AIService:
             'configured': True
         })
         
-        return available
+        return tuple(available)
     
     def generate_test_cases(self, requirements: str, project_type: str, provider: str = None) -> dict:
         """
@@ -133,22 +480,73 @@ class AIService:
         """
         # Use default provider if not specified
         if not provider:
-            provider = Config.DEFAULT_AI_PROVIDER
+            provider = self._default_provider_for(requirements)
+        
+        if self._race_providers:
+            return self._run_async(self.agenerate_test_cases(requirements, project_type, provider))
+        
+        cache_key = self._cache_key(provider, requirements, project_type)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
         
         prompt = self._build_prompt(requirements, project_type)
         
         try:
-            if provider == 'openrouter' and Config.OPENROUTER_API_KEY:
-                return self._generate_with_openrouter(prompt)
+            if provider == 'openrouter' and self.openrouter_client:
+                result = self._generate_with_openrouter(prompt)
             elif provider == 'gemini' and self.gemini_client:
-                return self._generate_with_gemini(prompt)
+                result = self._generate_with_gemini(prompt)
             elif provider == 'groq' and self.groq_client:
-                return self._generate_with_groq(prompt)
-            elif provider == 'together' and Config.TOGETHER_API_KEY:
-                return self._generate_with_together(prompt)
+                result = self._generate_with_groq(prompt)
+            elif provider == 'together' and self.together_client:
+                result = self._generate_with_together(prompt)
             elif provider == 'anthropic' and self.anthropic_client:
-                return self._generate_with_anthropic(prompt)
+                result = self._generate_with_anthropic(prompt)
+            else:
+                return self._generate_mock_test_cases(requirements, project_type)
+        except Exception as e:
+            print(f"AI generation error ({provider}): {str(e)}")
+            # Fallback to mock on error
+            result = self._generate_mock_test_cases(requirements, project_type)
+            result['error'] = f"AI provider error: {str(e)}"
+            return result
+        
+        self._cache_put(cache_key, result)
+        return result
+    
+    async def agenerate_test_cases(self, requirements: str, project_type: str, provider: str = None) -> dict:
+        """
+        Async variant of generate_test_cases using the providers' async clients.
+        
+        Provider calls are network-bound, so an event loop can keep many of them
+        in flight at once instead of blocking one worker thread per request.
+        
+        Args:
+            requirements: The software requirements text
+            project_type: Type of project (Web, Mobile, API, Desktop)
+            provider: AI provider to use (gemini, groq, together, anthropic, mock)
+            
+        Returns:
+            Dictionary containing test cases data
+        """
+        if not provider:
+            provider = self._default_provider_for(requirements)
+        
+        cache_key = self._cache_key(provider, requirements, project_type)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
+        prompt = self._build_prompt(requirements, project_type)
+        
+        try:
+            if self._race_providers:
+                result = await self._arace_providers(provider, prompt)
             else:
+                generate = self._async_generator_for(provider)
+                result = await generate(prompt) if generate else None
+            if result is None:
                 return self._generate_mock_test_cases(requirements, project_type)
         except Exception as e:
             print(f"AI generation error ({provider}): {str(e)}")
@@ -156,71 +554,310 @@ class AIService:
             result = self._generate_mock_test_cases(requirements, project_type)
             result['error'] = f"AI provider error: {str(e)}"
             return result
+        
+        self._cache_put(cache_key, result)
+        return result
+    
+    def _run_async(self, coro):
+        """
+        Run a coroutine on this service's long-lived event loop and wait for its result.
+        
+        asyncio.run() would start a fresh loop per call, and the async clients
+        (bound to the loop they were first used on) could never be reused.
+        """
+        if self._loop is None:
+            with self._async_lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, daemon=True, name='ai-async').start()
+                    self._loop = loop
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+    
+    def _async_client(self, provider: str):
+        """Return the async SDK client for provider on the running loop, building it on first use."""
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            clients = self._async_clients.setdefault(loop, {})
+        client = clients.get(provider)
+        if client is None:
+            client = clients[provider] = self._build_async_client(provider)
+        return client
+    
+    def _build_async_client(self, provider: str):
+        """Build an async SDK client; each keeps one pooled httpx.AsyncClient for its lifetime."""
+        if provider in ('openrouter', 'together'):
+            import httpx
+            import openai
+            api_key, base_url = {
+                'openrouter': (self._openrouter_key, "https://openrouter.ai/api/v1"),
+                'together': (self._together_key, "https://api.together.xyz/v1")
+            }[provider]
+            return openai.AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                    timeout=httpx.Timeout(600.0, connect=5.0)
+                )
+            )
+        if provider == 'groq':
+            from groq import AsyncGroq
+            return AsyncGroq(api_key=self._groq_key)
+        if provider == 'anthropic':
+            import anthropic
+            return anthropic.AsyncAnthropic(api_key=self._anthropic_key)
+        raise ValueError(f"No async client for provider: {provider}")
+    
+    def _async_generator_for(self, provider: str):
+        """Return the async generate method for a configured provider, or None."""
+        if provider == 'openrouter' and self._openrouter_key:
+            return self._agenerate_with_openrouter
+        if provider == 'gemini' and self.gemini_client:
+            return self._agenerate_with_gemini
+        if provider == 'groq' and self._groq_key:
+            return self._agenerate_with_groq
+        if provider == 'together' and self._together_key:
+            return self._agenerate_with_together
+        if provider == 'anthropic' and self._anthropic_key:
+            return self._agenerate_with_anthropic
+        return None
+    
+    async def _arace_providers(self, provider: str, prompt: str):
+        """
+        Query the requested provider and the next configured one concurrently.
+        
+        The first result with parsed test cases wins and the other request is
+        cancelled. Only a configured requested provider is raced; mock or an
+        unconfigured provider returns None so the caller serves demo results
+        without any upstream call. Raises the last provider error if every
+        request failed.
+        """
+        requested = self._async_generator_for(provider)
+        if requested is None:
+            return None
+        
+        others = [p for p in self.PROVIDERS if p not in (provider, 'mock')]
+        generators = [requested] + [g for g in map(self._async_generator_for, others) if g][:self.RACE_WIDTH - 1]
+        
+        pending = {asyncio.ensure_future(generate(prompt)) for generate in generators}
+        last_error = None
+        fallback = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        continue
+                    result = task.result()
+                    if result.get('test_cases') and not result.get('error'):
+                        return result
+                    fallback = result
+        finally:
+            for task in pending:
+                task.cancel()
+        
+        if fallback is not None:
+            return fallback
+        raise last_error
+    
+    def submit_test_cases_batch(self, jobs: list) -> str:
+        """Submit jobs to the Anthropic Message Batches API and return the batch id."""
+        batch = self.anthropic_client.messages.batches.create(requests=[
+            {
+                "custom_id": str(index),
+                "params": {
+                    "model": self._anthropic_model,
+                    "max_tokens": 4096,
+                    "system": SYSTEM_PROMPT,
+                    "messages": [{"role": "user", "content": self._build_prompt(requirements, project_type)}]
+                }
+            }
+            for index, (requirements, project_type) in enumerate(jobs)
+        ])
+        return batch.id
+    
+    def collect_test_cases_batch(self, batch_id: str, jobs: list):
+        """
+        Fetch the results of a submitted batch.
+        
+        Returns:
+            List of result dictionaries in job order, or None while the batch is still processing
+        """
+        batch = self.anthropic_client.messages.batches.retrieve(batch_id)
+        if batch.processing_status != 'ended':
+            return None
+        
+        results = [None] * len(jobs)
+        for entry in self.anthropic_client.messages.batches.results(batch_id):
+            index = int(entry.custom_id)
+            if entry.result.type == 'succeeded':
+                result = self._parse_response(entry.result.message.content[0].text, 'anthropic')
+                self._cache_put(self._cache_key('anthropic', *jobs[index]), result)
+                results[index] = result
+        
+        for index, (requirements, project_type) in enumerate(jobs):
+            if results[index] is None:
+                # Errored, canceled or expired requests fall back to mock like generate_test_cases
+                result = self._generate_mock_test_cases(requirements, project_type)
+                result['error'] = "AI provider error: batch request did not succeed"
+                results[index] = result
+        return results
+    
+    def stream_test_cases(self, requirements: str, project_type: str, provider: str = None):
+        """
+        Generate test cases, yielding each one as soon as the model has streamed it.
+        
+        The completion is accumulated chunk by chunk and every complete object in
+        the "test_cases" array is parsed out as it closes, so callers can render
+        results long before the full completion has arrived.
+        
+        Args:
+            requirements: The software requirements text
+            project_type: Type of project (Web, Mobile, API, Desktop)
+            provider: AI provider to use (gemini, groq, together, anthropic, mock)
+            
+        Yields:
+            Test case dictionaries
+        """
+        if not provider:
+            provider = self._default_provider_for(requirements)
+        
+        prompt = self._build_prompt(requirements, project_type)
+        try:
+            chunks = self._stream_chunks(provider, prompt)
+        except Exception as e:
+            print(f"AI streaming error ({provider}): {str(e)}")
+            chunks = None
+        if chunks is None:
+            yield from self._generate_mock_test_cases(requirements, project_type)['test_cases']
+            return
+        
+        buffer = ''
+        pos = None  # Index just past the last consumed test case (inside the array)
+        emitted = 0
+        try:
+            for chunk in chunks:
+                buffer += chunk
+                while True:
+                    if pos is None:
+                        key = buffer.find('"test_cases"')
+                        bracket = buffer.find('[', key) if key != -1 else -1
+                        if bracket == -1:
+                            break
+                        pos = bracket + 1
+                    
+                    span = _find_json_span(buffer, pos)
+                    if not span or buffer.find(']', pos, span[0]) != -1:
+                        break
+                    try:
+                        test_case = _json_loads(buffer[span[0]:span[1] + 1])
+                    except ValueError:
+                        test_case = None
+                    pos = span[1] + 1
+                    if test_case is not None:
+                        emitted += 1
+                        yield test_case
+        except Exception as e:
+            print(f"AI streaming error ({provider}): {str(e)}")
+        
+        if not emitted:
+            # Nothing usable arrived; fall back to mock like generate_test_cases
+            yield from self._generate_mock_test_cases(requirements, project_type)['test_cases']
+    
+    def _stream_chunks(self, provider: str, prompt: str):
+        """Return an iterator of completion text chunks, or None when no provider is usable."""
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        
+        if provider in ('openrouter', 'together', 'groq'):
+            client = getattr(self, f"{provider}_client")
+            if not client:
+                return None
+            stream = client.chat.completions.create(
+                model=self._model_for(provider),
+                messages=messages,
+                temperature=0.7,
+                max_tokens=4096,
+                stream=True
+            )
+            return (chunk.choices[0].delta.content or '' for chunk in stream if chunk.choices)
+        
+        if provider == 'gemini' and self.gemini_client:
+            stream = self.gemini_client.generate_content(prompt, stream=True)
+            return (chunk.text for chunk in stream)
+        
+        if provider == 'anthropic' and self.anthropic_client:
+            stream = self.anthropic_client.messages.create(
+                model=self._anthropic_model,
+                max_tokens=4096,
+                system=SYSTEM_PROMPT,
+                messages=[{"role": "user", "content": prompt}],
+                stream=True
+            )
+            return (event.delta.text for event in stream
+                    if event.type == 'content_block_delta' and event.delta.type == 'text_delta')
+        
+        return None
+    
+    def estimate_tokens(self, text: str) -> int:
+        """Cheap estimate of how many tokens text will use, for routing and cost accounting."""
+        if not _numba_load_started:
+            _start_numba_load()
+        return _approx_tokens(text.encode('utf-8'))
+    
+    def _default_provider_for(self, requirements: str) -> str:
+        """Pick the provider for a request that didn't name one, routing large prompts by estimated size."""
+        if self._large_prompt_provider and self.estimate_tokens(requirements) > self._large_prompt_tokens:
+            return self._large_prompt_provider
+        return self._default_provider
+    
+    def _model_for(self, provider: str) -> str:
+        """Return the configured model name for a provider."""
+        return self._models.get(provider, '')
+    
+    def _cache_key(self, provider: str, requirements: str, project_type: str) -> str:
+        """Build the response cache key from provider, model and normalized requirements."""
+        normalized = _WHITESPACE_RE.sub(' ', requirements.lower()).strip()
+        raw = f"{provider}:{self._model_for(provider)}:{normalized}:{project_type}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    
+    def _cache_get(self, key: str):
+        """Return a cached result, or None if missing or expired."""
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return dict(entry[1])
+    
+    def _cache_put(self, key: str, result: dict) -> None:
+        """Store a successful provider result, evicting the least recently used entry."""
+        if result.get('error') or result.get('provider') == 'mock':
+            return
+        with self._cache_lock:
+            self._cache[key] = (time.time() + self.CACHE_TTL_SECONDS, result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.CACHE_MAX_ENTRIES:
+                self._cache.popitem(last=False)
     
     def _build_prompt(self, requirements: str, project_type: str) -> str:
-        """Build the prompt for AI providers."""
-        return f"""You are an expert QA engineer. Generate industry-standard test cases based on the following requirements.
-
-Project Type: {project_type}
-
-Requirements:
-{requirements}
-
-Generate comprehensive test cases in JSON format. Each test case should include:
-- Test ID (format: TC_XXX)
-- Module (the feature/component being tested)
-- Test Scenario (description of what is being tested)
-- Preconditions (what must be true before the test)
-- Steps (numbered list of test steps)
-- Test Data (sample data to use)
-- Expected Result (what should happen)
-- Actual Result (leave as empty string)
-- Status (leave as "Pending")
-- Priority (High, Medium, or Low)
-- Severity (Critical, Major, Minor, or Trivial)
-- Edge Cases (any edge case considerations)
-
-Return the response as a valid JSON object with this structure:
-{{
-    "test_cases": [
-        {{
-            "test_id": "TC_001",
-            "module": "...",
-            "test_scenario": "...",
-            "preconditions": "...",
-            "steps": "1. Step one\\n2. Step two\\n3. Step three",
-            "test_data": "...",
-            "expected_result": "...",
-            "actual_result": "",
-            "status": "Pending",
-            "priority": "High|Medium|Low",
-            "severity": "Critical|Major|Minor|Trivial",
-            "edge_cases": "..."
-        }}
-    ],
-    "summary": {{
-        "total_test_cases": X,
-        "high_priority": X,
-        "medium_priority": X,
-        "low_priority": X
-    }}
-}}
-
-Generate at least 5-10 comprehensive test cases covering positive, negative, and edge cases.
-IMPORTANT: Return ONLY the JSON object, no additional text or markdown formatting."""
+        """Build the per-request user prompt; the static instructions live in SYSTEM_PROMPT."""
+        return _USER_PROMPT_PREFIX + project_type + _USER_PROMPT_REQUIREMENTS + requirements
     
     def _generate_with_openrouter(self, prompt: str) -> dict:
         """Generate test cases using OpenRouter (DeepSeek free model)."""
-        import openai
-        
-        client = openai.OpenAI(
-            api_key=Config.OPENROUTER_API_KEY,
-            base_url="https://openrouter.ai/api/v1"
-        )
-        
-        response = client.chat.completions.create(
-            model=Config.OPENROUTER_MODEL,
-            messages=[{"role": "user", "content": prompt}],
+        response = self.openrouter_client.chat.completions.create(
+            model=self._openrouter_model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
             temperature=0.7,
             max_tokens=4096
         )
@@ -234,8 +871,11 @@ IMPORTANT: Return ONLY the JSON object, no additional text or markdown formattin
     def _generate_with_groq(self, prompt: str) -> dict:
         """Generate test cases using Groq."""
         chat_completion = self.groq_client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model=Config.GROQ_MODEL,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            model=self._groq_model,
             temperature=0.7,
             max_tokens=4096
         )
@@ -243,16 +883,12 @@ IMPORTANT: Return ONLY the JSON object, no additional text or markdown formattin
     
     def _generate_with_together(self, prompt: str) -> dict:
         """Generate test cases using Together AI."""
-        import openai
-        
-        client = openai.OpenAI(
-            api_key=Config.TOGETHER_API_KEY,
-            base_url="https://api.together.xyz/v1"
-        )
-        
-        response = client.chat.completions.create(
-            model=Config.TOGETHER_MODEL,
-            messages=[{"role": "user", "content": prompt}],
+        response = self.together_client.chat.completions.create(
+            model=self._together_model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
             temperature=0.7,
             max_tokens=4096
         )
@@ -261,8 +897,63 @@ IMPORTANT: Return ONLY the JSON object, no additional text or markdown formattin
     def _generate_with_anthropic(self, prompt: str) -> dict:
         """Generate test cases using Anthropic Claude."""
         message = self.anthropic_client.messages.create(
-            model=Config.AI_MODEL,
+            model=self._anthropic_model,
             max_tokens=4096,
+            system=SYSTEM_PROMPT,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return self._parse_response(message.content[0].text, 'anthropic')
+    
+    async def _agenerate_with_openrouter(self, prompt: str) -> dict:
+        """Async variant of _generate_with_openrouter."""
+        response = await self._async_client('openrouter').chat.completions.create(
+            model=self._openrouter_model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=4096
+        )
+        return self._parse_response(response.choices[0].message.content, 'openrouter')
+    
+    async def _agenerate_with_gemini(self, prompt: str) -> dict:
+        """Async variant of _generate_with_gemini."""
+        response = await self.gemini_client.generate_content_async(prompt)
+        return self._parse_response(response.text, 'gemini')
+    
+    async def _agenerate_with_groq(self, prompt: str) -> dict:
+        """Async variant of _generate_with_groq."""
+        chat_completion = await self._async_client('groq').chat.completions.create(
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            model=self._groq_model,
+            temperature=0.7,
+            max_tokens=4096
+        )
+        return self._parse_response(chat_completion.choices[0].message.content, 'groq')
+    
+    async def _agenerate_with_together(self, prompt: str) -> dict:
+        """Async variant of _generate_with_together."""
+        response = await self._async_client('together').chat.completions.create(
+            model=self._together_model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=4096
+        )
+        return self._parse_response(response.choices[0].message.content, 'together')
+    
+    async def _agenerate_with_anthropic(self, prompt: str) -> dict:
+        """Async variant of _generate_with_anthropic."""
+        message = await self._async_client('anthropic').messages.create(
+            model=self._anthropic_model,
+            max_tokens=4096,
+            system=SYSTEM_PROMPT,
             messages=[{"role": "user", "content": prompt}]
         )
         return self._parse_response(message.content[0].text, 'anthropic')
@@ -271,27 +962,20 @@ IMPORTANT: Return ONLY the JSON object, no additional text or markdown formattin
         """Parse the AI response into structured data."""
         try:
             # Try to extract JSON from the response
-            cleaned = response_text.strip()
-            if cleaned.startswith('```json'):
-                cleaned = cleaned[7:]
-            if cleaned.startswith('```'):
-                cleaned = cleaned[3:]
-            if cleaned.endswith('```'):
-                cleaned = cleaned[:-3]
-            cleaned = cleaned.strip()
+            cleaned = response_text.strip().removeprefix('```json').removeprefix('```').removesuffix('```').strip()
             
-            result = json.loads(cleaned)
+            result = _json_loads(cleaned)
             result['provider'] = provider
             return result
-        except json.JSONDecodeError:
-            # Try to find JSON object in the response
-            json_match = re.search(r'\{[\s\S]*\}', response_text)
-            if json_match:
+        except ValueError:
+            # Try to find JSON object in the response (orjson and json decode errors are ValueErrors)
+            span = _find_json_span(response_text)
+            if span:
                 try:
-                    result = json.loads(json_match.group())
+                    result = _json_loads(response_text[span[0]:span[1] + 1])
                     result['provider'] = provider
                     return result
-                except json.JSONDecodeError:
+                except ValueError:
                     pass
             
             # Return a structured error response
@@ -304,90 +988,20 @@ IMPORTANT: Return ONLY the JSON object, no additional text or markdown formattin
     
     def _generate_mock_test_cases(self, requirements: str, project_type: str) -> dict:
         """Generate mock test cases when no API is available."""
-        words = requirements.split()[:10]
-        module_name = words[0] if words else "Feature"
+        # Only the first word is used; don't split the whole document for it
+        words = requirements.split(None, 1)
+        module_name = words[0][:_MOCK_MODULE_NAME_MAX] if words else "Feature"
         
-        mock_test_cases = [
-            {
-                "test_id": "TC_001",
-                "module": f"{module_name} - Core Functionality",
-                "test_scenario": "Verify basic functionality works as expected",
-                "preconditions": "System is accessible and user is authenticated",
-                "steps": "1. Navigate to the feature\n2. Perform the primary action\n3. Verify the result",
-                "test_data": "Valid input data",
-                "expected_result": "Action completes successfully with expected output",
-                "actual_result": "",
-                "status": "Pending",
-                "priority": "High",
-                "severity": "Critical",
-                "edge_cases": "Test with minimum and maximum valid inputs"
-            },
-            {
-                "test_id": "TC_002",
-                "module": f"{module_name} - Input Validation",
-                "test_scenario": "Verify system handles invalid input gracefully",
-                "preconditions": "System is accessible",
-                "steps": "1. Navigate to the input form\n2. Enter invalid data\n3. Submit the form\n4. Verify error handling",
-                "test_data": "Invalid/malformed input data",
-                "expected_result": "System displays appropriate error message",
-                "actual_result": "",
-                "status": "Pending",
-                "priority": "High",
-                "severity": "Major",
-                "edge_cases": "Test with empty inputs, special characters, SQL injection attempts"
-            },
-            {
-                "test_id": "TC_003",
-                "module": f"{module_name} - Boundary Testing",
-                "test_scenario": "Verify system handles boundary conditions",
-                "preconditions": "System is accessible with valid permissions",
-                "steps": "1. Test with minimum boundary value\n2. Test with maximum boundary value\n3. Test with values just outside boundaries",
-                "test_data": "Boundary values (min, max, min-1, max+1)",
-                "expected_result": "System accepts valid boundary values and rejects invalid ones",
-                "actual_result": "",
-                "status": "Pending",
-                "priority": "Medium",
-                "severity": "Major",
-                "edge_cases": "Consider integer overflow, date boundaries"
-            },
-            {
-                "test_id": "TC_004",
-                "module": f"{module_name} - Error Handling",
-                "test_scenario": "Verify system error handling and recovery",
-                "preconditions": "System is accessible",
-                "steps": "1. Simulate error condition\n2. Verify error is logged\n3. Verify user-friendly message displayed\n4. Verify system recovery",
-                "test_data": "Conditions that trigger errors",
-                "expected_result": "System handles errors gracefully without crashing",
-                "actual_result": "",
-                "status": "Pending",
-                "priority": "Medium",
-                "severity": "Major",
-                "edge_cases": "Network failures, timeout conditions, server errors"
-            },
-            {
-                "test_id": "TC_005",
-                "module": f"{module_name} - {project_type} Specific",
-                "test_scenario": f"Verify {project_type}-specific requirements",
-                "preconditions": f"{project_type} environment is properly configured",
-                "steps": f"1. Set up {project_type} test environment\n2. Execute {project_type}-specific test\n3. Verify results",
-                "test_data": f"{project_type}-specific test data",
-                "expected_result": f"All {project_type}-specific requirements are met",
-                "actual_result": "",
-                "status": "Pending",
-                "priority": "High",
-                "severity": "Critical",
-                "edge_cases": f"Cross-platform compatibility for {project_type}"
-            }
-        ]
+        mock_test_cases = []
+        for template, fields in zip(_MOCK_TEMPLATES, _MOCK_FORMAT_FIELDS):
+            test_case = dict(template)
+            for key in fields:
+                test_case[key] = test_case[key].format(mod=module_name, pt=project_type)
+            mock_test_cases.append(test_case)
         
         return {
             "test_cases": mock_test_cases,
-            "summary": {
-                "total_test_cases": len(mock_test_cases),
-                "high_priority": 3,
-                "medium_priority": 2,
-                "low_priority": 0
-            },
+            "summary": dict(_MOCK_SUMMARY),
             "provider": "mock",
-            "note": "Demo mode - Configure an AI provider API key for real test case generation"
+            "note": _MOCK_NOTE
         }
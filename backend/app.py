@@ -1,4 +1,5 @@
 import os
+import time
 from flask import Flask, jsonify
 from flask_cors import CORS
 from config import Config
@@ -6,22 +7,35 @@ from models.database import init_db
 from routes.auth import auth_bp
 from routes.generate import generate_bp
 from routes.export import export_bp
+from utils.helpers import SpooledUploadRequest, ORJSONProvider, ORJSON_AVAILABLE
+
+# /api/debug result, reused for a few seconds so polling health checkers don't hit the DB each time
+DEBUG_CACHE_TTL_SECONDS = 5.0
+_debug_cache = None  # (monotonic timestamp, payload)
 
 
 def create_app():
     """Create and configure the Flask application."""
     app = Flask(__name__)
+    app.request_class = SpooledUploadRequest
+    
+    # jsonify/get_json go through orjson when it is installed
+    if ORJSON_AVAILABLE:
+        app.json = ORJSONProvider(app)
     
     # Load configuration
     app.config.from_object(Config)
     app.config['MAX_CONTENT_LENGTH'] = Config.MAX_CONTENT_LENGTH
     
     # Enable CORS for frontend
+    # Browsers cache preflights for max_age, so repeat API calls skip the OPTIONS round trip
     CORS(app, resources={
         r"/api/*": {
-            "origins": "*",  # Allow all origins for Vercel deployment
+            "origins": sorted(Config.ALLOWED_ORIGINS) or "*",  # Any origin unless ALLOWED_ORIGINS is set
             "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization"]
+            "allow_headers": ["Content-Type", "Authorization"],
+            "max_age": 86400,
+            "send_wildcard": False
         }
     })
     
@@ -41,13 +55,6 @@ def create_app():
     #     print(f"Failed to initialize database: {e}")
     #     pass
     
-    # Create upload folder
-    try:
-        os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
-    except Exception as e:
-        print(f"Warning: Failed to create upload folder: {e}")
-        # On Vercel, this might fail if Config.UPLOAD_FOLDER is incorrectly set to read-only path
-    
     # Error handlers
     @app.errorhandler(400)
     def bad_request(error):
@@ -85,6 +92,10 @@ def create_app():
     # DEBUG: Diagnostic endpoint to help find Vercel issues
     @app.route('/api/debug', methods=['GET'])
     def debug_status():
+        global _debug_cache
+        if _debug_cache and time.monotonic() - _debug_cache[0] < DEBUG_CACHE_TTL_SECONDS:
+            return jsonify(_debug_cache[1]), 200
+        
         try:
             # Check Env Vars (Masked)
             env_vars = {
@@ -112,12 +123,14 @@ def create_app():
                 db_status = "Failed"
                 db_error = str(e)
                 
-            return jsonify({
+            payload = {
                 'status': 'debug',
                 'environment': env_vars,
                 'database_status': db_status,
                 'database_error': db_error
-            }), 200
+            }
+            _debug_cache = (time.monotonic(), payload)
+            return jsonify(payload), 200
         except Exception as e:
             return jsonify({'error': f"Debug endpoint failed: {str(e)}"}), 500
 
@@ -1,10 +1,33 @@
 import os
+import time
+import base64
+import binascii
+import hashlib
 import secrets
+import threading
 import bcrypt
-from datetime import datetime, timedelta
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from flask import Flask, jsonify, request, session
 from flask_cors import CORS
 
+# Optional Argon2 import (bcrypt is kept for existing hashes)
+try:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import VerifyMismatchError, InvalidHashError
+    ARGON2_AVAILABLE = True
+except ImportError:
+    ARGON2_AVAILABLE = False
+    print("Warning: argon2-cffi not found. Falling back to bcrypt for new hashes.")
+
+# Optional Redis import (sessions shared across workers and restarts)
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', secrets.token_hex(32))
 
@@ -19,14 +42,43 @@ CORS(app, resources={
 
 # In-memory storage (will reset on each deployment, but works for demo)
 users = {}  # {email: {name, password_hash, created_at}}
-sessions_store = {}  # {token: {user_email, expires_at}}
+sessions_store = {}  # {token_bytes: {user_email, expires_at}} - expires_at is time.monotonic() based
 files_store = {}  # {file_id: {user_email, filename, test_cases, created_at}}
+files_by_user = {}  # {email: [file_id, ...]} - index so history doesn't scan every file
+
+# With REDIS_URL set, sessions (sess:<token> -> email, expiring on their own) and user
+# records (user:<email> hash) live in Redis, so a token issued by one worker resolves on
+# any other and survives restarts. Generated files stay in this process's files_store,
+# so history and downloads are still per worker: run a single worker for those.
+SESSION_TTL_SECONDS = 24 * 60 * 60
+redis_client = None
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_AVAILABLE and REDIS_URL:
+    try:
+        redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+    except Exception as e:
+        print(f"Redis init failed: {e}. Falling back to in-memory sessions.")
+        redis_client = None
 
 # Import services
 from services.ai_service import AIService
 from services.file_parser import FileParser
+from utils.helpers import save_stream_to_tempfile, SpooledUploadRequest, get_bcrypt_salt, ORJSONProvider, ORJSON_AVAILABLE
 from config import Config
 
+# Multipart uploads stay in memory up to 1 MiB before spilling to disk
+app.request_class = SpooledUploadRequest
+
+# jsonify/get_json go through orjson when it is installed
+if ORJSON_AVAILABLE:
+    app.json = ORJSONProvider(app)
+
+# Upload folder is created once here rather than on every upload request
+try:
+    os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
+except Exception as e:
+    print(f"Warning: Failed to create upload folder: {e}")
+
 # Lazy load AI service
 _ai_service = None
 
@@ -40,46 +92,153 @@ def get_ai_service():
             return None
     return _ai_service
 
+# bcrypt and argon2-cffi release the GIL, so hashes run on a bounded pool of threads across
+# cores instead of serializing on the request thread; one worker per CPU avoids oversubscription.
+_hash_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='pwhash')
+
+# Argon2id hasher for new passwords; hashes are self-describing ($argon2id$...)
+_ph = PasswordHasher(time_cost=3, memory_cost=65536, parallelism=2) if ARGON2_AVAILABLE else None
+
+def _hash_password_sync(password):
+    if _ph:
+        return _ph.hash(password)
+    salt = get_bcrypt_salt(Config.BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+def _verify_password_sync(password, password_hash):
+    if password_hash.startswith('$argon2'):
+        if not _ph:
+            return False
+        try:
+            return _ph.verify(password_hash, password)
+        except (VerifyMismatchError, InvalidHashError):
+            return False
+    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
 def hash_password(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return _hash_pool.submit(_hash_password_sync, password).result()
+
+def password_needs_rehash(password_hash):
+    """True for legacy bcrypt hashes or Argon2 hashes with outdated parameters."""
+    if not _ph:
+        return False
+    if not password_hash.startswith('$argon2'):
+        return True
+    return _ph.check_needs_rehash(password_hash)
+
+# Recently verified (password, hash) pairs, so repeat logins skip hashing for a short window
+VERIFY_CACHE_TTL_SECONDS = 60
+VERIFY_CACHE_MAX = 1024
+_verify_cache = {}  # {sha256(password|hash): expires_at (monotonic)}
 
 def verify_password(password, password_hash):
-    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    key = hashlib.sha256(password.encode('utf-8') + b'|' + password_hash.encode('utf-8')).digest()
+    now = time.monotonic()
+    expires_at = _verify_cache.get(key)
+    if expires_at is not None and expires_at > now:
+        return True
+    
+    if not _hash_pool.submit(_verify_password_sync, password, password_hash).result():
+        return False
+    
+    if len(_verify_cache) >= VERIFY_CACHE_MAX:
+        for stale in [k for k, exp in _verify_cache.items() if exp <= now]:
+            del _verify_cache[stale]
+        if len(_verify_cache) >= VERIFY_CACHE_MAX:
+            _verify_cache.clear()
+    _verify_cache[key] = now + VERIFY_CACHE_TTL_SECONDS
+    return True
+
+def get_user(email):
+    """Return a user record, loading it from Redis when another worker created it."""
+    user = users.get(email)
+    if user is None and redis_client:
+        user = redis_client.hgetall(f'user:{email}') or None
+        if user:
+            users[email] = user
+    return user
+
+def save_user(user):
+    """Store a user record locally and, when configured, in Redis for the other workers."""
+    users[user['email']] = user
+    if redis_client:
+        redis_client.hset(f'user:{user["email"]}', mapping=user)
 
 def create_session_token(email):
-    token = secrets.token_hex(32)
-    expires_at = datetime.now() + timedelta(hours=24)
-    sessions_store[token] = {'user_email': email, 'expires_at': expires_at}
+    # In-memory sessions are keyed by the raw 24 bytes; clients get the base64url form
+    token_bytes = secrets.token_bytes(24)
+    token = base64.urlsafe_b64encode(token_bytes).rstrip(b'=').decode()
+    if redis_client:
+        redis_client.setex(f'sess:{token}', SESSION_TTL_SECONDS, email)
+        return token
+    
+    expires_at = time.monotonic() + SESSION_TTL_SECONDS
+    sessions_store[token_bytes] = {'user_email': email, 'expires_at': expires_at}
     return token
 
+def _token_key(token):
+    """Decode a base64url bearer token back to the bytes key used in sessions_store"""
+    try:
+        return base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+    except (binascii.Error, ValueError):
+        return None
+
+# Expired tokens seen by get_current_user, deleted in bulk by a background reaper
+# so the request path only ever reads sessions_store.
+REAP_INTERVAL_SECONDS = 60
+_expired_tokens = deque()
+
+def _reap_expired_sessions():
+    while _expired_tokens:
+        sessions_store.pop(_expired_tokens.popleft(), None)
+    _schedule_reaper()
+
+def _schedule_reaper():
+    timer = threading.Timer(REAP_INTERVAL_SECONDS, _reap_expired_sessions)
+    timer.daemon = True
+    timer.start()
+
+if not redis_client:
+    _schedule_reaper()
+
 def get_current_user():
     auth_header = request.headers.get('Authorization', '')
     if not auth_header.startswith('Bearer '):
         return None
     
     token = auth_header[7:]
-    session_data = sessions_store.get(token)
+    if redis_client:
+        email = redis_client.get(f'sess:{token}')
+        return get_user(email) if email else None
+    
+    token_key = _token_key(token)
+    session_data = sessions_store.get(token_key) if token_key else None
     
     if not session_data:
         return None
     
-    if session_data['expires_at'] < datetime.now():
-        del sessions_store[token]
+    if session_data['expires_at'] < time.monotonic():
+        _expired_tokens.append(token_key)
         return None
     
-    return users.get(session_data['user_email'])
+    return get_user(session_data['user_email'])
 
 @app.route('/', methods=['GET'])
 def index():
     return "Smart QA Test Case Generator - Backend is Running", 200
 
+# Health body is constant apart from the two counters; the stores are fixed at import.
+# file_store is always memory, so a redis session_store alone doesn't make this multi-worker safe.
+_HEALTH_TMPL = (
+    b'{"status":"healthy","users_count":%d,"sessions_count":%d,"session_store":"'
+    + (b'redis' if redis_client else b'memory') + b'","user_store":"'
+    + (b'redis' if redis_client else b'memory') + b'","file_store":"memory"}'
+)
+
 @app.route('/api/health', methods=['GET'])
 def health():
-    return jsonify({
-        'status': 'healthy',
-        'users_count': len(users),
-        'sessions_count': len(sessions_store)
-    }), 200
+    body = _HEALTH_TMPL % (len(users), len(sessions_store))
+    return app.response_class(body, status=200, mimetype='application/json')
 
 @app.route('/api/signup', methods=['POST'])
 def signup():
@@ -95,15 +254,15 @@ def signup():
         if len(password) < 6:
             return jsonify({'error': 'Password must be at least 6 characters'}), 400
         
-        if email in users:
+        if get_user(email):
             return jsonify({'error': 'Email already registered'}), 409
         
-        users[email] = {
+        save_user({
             'name': name,
             'email': email,
             'password_hash': hash_password(password),
             'created_at': datetime.now().isoformat()
-        }
+        })
         
         token = create_session_token(email)
         
@@ -125,10 +284,15 @@ def login():
         if not email or not password:
             return jsonify({'error': 'Email and password are required'}), 400
         
-        user = users.get(email)
+        user = get_user(email)
         if not user or not verify_password(password, user['password_hash']):
             return jsonify({'error': 'Invalid email or password'}), 401
         
+        # Upgrade legacy bcrypt / outdated Argon2 hashes on successful login
+        if password_needs_rehash(user['password_hash']):
+            user['password_hash'] = hash_password(password)
+            save_user(user)
+        
         token = create_session_token(email)
         
         return jsonify({
@@ -144,8 +308,12 @@ def logout():
     auth_header = request.headers.get('Authorization', '')
     if auth_header.startswith('Bearer '):
         token = auth_header[7:]
-        if token in sessions_store:
-            del sessions_store[token]
+        if redis_client:
+            redis_client.delete(f'sess:{token}')
+        else:
+            token_key = _token_key(token)
+            if token_key:
+                sessions_store.pop(token_key, None)
     return jsonify({'message': 'Logged out successfully'}), 200
 
 @app.route('/api/me', methods=['GET'])
@@ -155,6 +323,18 @@ def get_me():
         return jsonify({'error': 'Unauthorized'}), 401
     return jsonify({'user': {'name': user['name'], 'email': user['email']}}), 200
 
+# Provider list is fixed for the process lifetime, so its JSON body is encoded once
+_providers_body = None
+
+def _providers_response_body(service):
+    global _providers_body
+    if _providers_body is None:
+        _providers_body = app.json.dumps({
+            'providers': service.get_available_providers(),
+            'default': Config.DEFAULT_AI_PROVIDER
+        }).encode('utf-8')
+    return _providers_body
+
 @app.route('/api/providers', methods=['GET'])
 def get_providers():
     service = get_ai_service()
@@ -164,10 +344,7 @@ def get_providers():
             'default': 'mock'
         }), 200
     
-    return jsonify({
-        'providers': service.get_available_providers(),
-        'default': Config.DEFAULT_AI_PROVIDER
-    }), 200
+    return app.response_class(_providers_response_body(service), status=200, mimetype='application/json')
 
 @app.route('/api/generate', methods=['POST'])
 def generate():
@@ -179,31 +356,44 @@ def generate():
         requirements = None
         project_type = 'Web'
         
-        if 'file' in request.files:
+        # Raw upload: the body is the file itself, named by the X-Filename header.
+        # It is streamed to disk in blocks instead of going through the multipart parser.
+        raw_filename = request.headers.get('X-Filename')
+        is_multipart = request.mimetype == 'multipart/form-data'
+        raw_upload = bool(raw_filename) and not is_multipart and request.mimetype != 'application/json'
+        
+        if raw_upload:
+            if not FileParser.allowed_file(raw_filename, Config.ALLOWED_EXTENSIONS):
+                return jsonify({'error': 'Invalid file type'}), 400
+            
+            suffix = os.path.splitext(raw_filename)[1].lower()
+            file_path = save_stream_to_tempfile(request.stream, suffix, Config.UPLOAD_FOLDER)
+            
+            try:
+                requirements = FileParser.extract_text(file_path)
+            finally:
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+        elif is_multipart and 'file' in request.files:
             file = request.files['file']
             if file and file.filename:
                 if not FileParser.allowed_file(file.filename, Config.ALLOWED_EXTENSIONS):
                     return jsonify({'error': 'Invalid file type'}), 400
                 
-                os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
-                from werkzeug.utils import secure_filename
-                filename = secure_filename(file.filename)
-                file_path = os.path.join(Config.UPLOAD_FOLDER, filename)
-                file.save(file_path)
-                
-                try:
-                    requirements = FileParser.extract_text(file_path)
-                finally:
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
+                # Parse the upload in place; no temp file write/read/delete
+                extension = os.path.splitext(file.filename)[1]
+                requirements = FileParser.extract_text_from_stream(file.stream, extension)
         
-        if request.content_type and 'multipart/form-data' in request.content_type:
+        if raw_upload:
+            project_type = request.args.get('project_type', 'Web')
+            ai_provider = request.args.get('ai_provider', None)
+        elif is_multipart:
             if not requirements:
                 requirements = request.form.get('requirements', '').strip()
             project_type = request.form.get('project_type', 'Web')
             ai_provider = request.form.get('ai_provider', None)
         else:
-            data = request.get_json() or {}
+            data = request.get_json(silent=True) or {}
             if not requirements:
                 requirements = data.get('requirements', '').strip()
             project_type = data.get('project_type', 'Web')
@@ -222,11 +412,12 @@ def generate():
         file_id = len(files_store) + 1
         files_store[file_id] = {
             'user_email': user['email'],
-            'filename': f"test_cases_{project_type.lower()}_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+            'filename': f"test_cases_{project_type.lower()}_{int(time.time() * 1000):x}_{secrets.token_hex(3)}",
             'test_cases': result,
             'project_type': project_type,
             'created_at': datetime.now().isoformat()
         }
+        files_by_user.setdefault(user['email'], []).append(file_id)
         
         return jsonify({
             'success': True,
@@ -244,18 +435,21 @@ def get_history():
     if not user:
         return jsonify({'error': 'Unauthorized'}), 401
     
-    user_files = [
-        {
+    user_files = []
+    for fid in files_by_user.get(user['email'], ()):
+        fdata = files_store[fid]
+        user_files.append({
             'id': fid,
             'filename': fdata['filename'],
             'project_type': fdata['project_type'],
             'created_at': fdata['created_at']
-        }
-        for fid, fdata in files_store.items()
-        if fdata['user_email'] == user['email']
-    ]
+        })
     
     return jsonify({'history': user_files}), 200
 
+# Build the AI service during startup so the first request doesn't pay for it
+if not os.environ.get('SKIP_WARMUP'):
+    get_ai_service()
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
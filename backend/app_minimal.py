@@ -1,14 +1,18 @@
-from flask import Flask, jsonify
+import json
+from flask import Flask
 
 app = Flask(__name__)
 
+# Constant body, encoded once at import
+_TEST_BODY = json.dumps({'status': 'success', 'message': 'API is working'}).encode('utf-8')
+
 @app.route('/')
 def index():
     return "Minimal Flask App - Working!", 200
 
 @app.route('/api/test')
 def test():
-    return jsonify({'status': 'success', 'message': 'API is working'}), 200
+    return app.response_class(_TEST_BODY, status=200, mimetype='application/json')
 
 if __name__ == '__main__':
     app.run()
@@ -10,8 +10,22 @@ CORS(app, resources={r"/*": {"origins": "*"}})
 # Import services
 from services.ai_service import AIService
 from services.file_parser import FileParser
+from utils.helpers import save_stream_to_tempfile, SpooledUploadRequest, ORJSONProvider, ORJSON_AVAILABLE
 from config import Config
 
+# Multipart uploads stay in memory up to 1 MiB before spilling to disk
+app.request_class = SpooledUploadRequest
+
+# jsonify/get_json go through orjson when it is installed
+if ORJSON_AVAILABLE:
+    app.json = ORJSONProvider(app)
+
+# Upload folder is created once here rather than on every upload request
+try:
+    os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
+except Exception as e:
+    print(f"Warning: Failed to create upload folder: {e}")
+
 # Lazy load AI service
 _ai_service = None
 
@@ -33,6 +47,18 @@ def index():
 def health():
     return jsonify({'status': 'healthy', 'message': 'API is running'}), 200
 
+# Provider list is fixed for the process lifetime, so its JSON body is encoded once
+_providers_body = None
+
+def _providers_response_body(service):
+    global _providers_body
+    if _providers_body is None:
+        _providers_body = app.json.dumps({
+            'providers': service.get_available_providers(),
+            'default': Config.DEFAULT_AI_PROVIDER
+        }).encode('utf-8')
+    return _providers_body
+
 @app.route('/api/providers', methods=['GET'])
 def get_providers():
     service = get_ai_service()
@@ -42,11 +68,7 @@ def get_providers():
             'default': 'mock'
         }), 200
     
-    providers = service.get_available_providers()
-    return jsonify({
-        'providers': providers,
-        'default': Config.DEFAULT_AI_PROVIDER
-    }), 200
+    return app.response_class(_providers_response_body(service), status=200, mimetype='application/json')
 
 @app.route('/api/generate', methods=['POST'])
 def generate_test_cases():
@@ -54,34 +76,45 @@ def generate_test_cases():
         requirements = None
         project_type = 'Web'
         
-        # Check if file was uploaded
-        if 'file' in request.files:
+        # Raw upload: the body is the file itself, named by the X-Filename header.
+        # It is streamed to disk in blocks instead of going through the multipart parser.
+        raw_filename = request.headers.get('X-Filename')
+        is_multipart = request.mimetype == 'multipart/form-data'
+        raw_upload = bool(raw_filename) and not is_multipart and request.mimetype != 'application/json'
+        
+        if raw_upload:
+            if not FileParser.allowed_file(raw_filename, Config.ALLOWED_EXTENSIONS):
+                return jsonify({'error': 'Invalid file type. Allowed: PDF, DOCX, TXT'}), 400
+            
+            suffix = os.path.splitext(raw_filename)[1].lower()
+            file_path = save_stream_to_tempfile(request.stream, suffix, Config.UPLOAD_FOLDER)
+            
+            try:
+                requirements = FileParser.extract_text(file_path)
+            finally:
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+        elif is_multipart and 'file' in request.files:
             file = request.files['file']
             if file and file.filename:
                 if not FileParser.allowed_file(file.filename, Config.ALLOWED_EXTENSIONS):
                     return jsonify({'error': 'Invalid file type. Allowed: PDF, DOCX, TXT'}), 400
                 
-                # Save file temporarily
-                os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
-                from werkzeug.utils import secure_filename
-                filename = secure_filename(file.filename)
-                file_path = os.path.join(Config.UPLOAD_FOLDER, filename)
-                file.save(file_path)
-                
-                try:
-                    requirements = FileParser.extract_text(file_path)
-                finally:
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
+                # Parse the upload in place; no temp file write/read/delete
+                extension = os.path.splitext(file.filename)[1]
+                requirements = FileParser.extract_text_from_stream(file.stream, extension)
         
         # Get form data or JSON data
-        if request.content_type and 'multipart/form-data' in request.content_type:
+        if raw_upload:
+            project_type = request.args.get('project_type', 'Web')
+            ai_provider = request.args.get('ai_provider', None)
+        elif is_multipart:
             if not requirements:
                 requirements = request.form.get('requirements', '').strip()
             project_type = request.form.get('project_type', 'Web')
             ai_provider = request.form.get('ai_provider', None)
         else:
-            data = request.get_json() or {}
+            data = request.get_json(silent=True) or {}
             if not requirements:
                 requirements = data.get('requirements', '').strip()
             project_type = data.get('project_type', 'Web')
@@ -112,5 +145,9 @@ def generate_test_cases():
         print(f"Generation error: {str(e)}")
         return jsonify({'error': f'An error occurred: {str(e)}'}), 500
 
+# Build the AI service during startup so the first request doesn't pay for it
+if not os.environ.get('SKIP_WARMUP'):
+    get_ai_service()
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
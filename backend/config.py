@@ -10,6 +10,11 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
     DEBUG = os.environ.get('FLASK_DEBUG', 'True').lower() == 'true'
     
+    # CORS: comma-separated frontend origins; empty allows any origin
+    ALLOWED_ORIGINS = frozenset(
+        origin.strip() for origin in os.environ.get('ALLOWED_ORIGINS', '').split(',') if origin.strip()
+    )
+    
     # Database settings
     # Database settings
     # Use POSTGRES_URL (Vercel default) or DATABASE_URL (Generic)
@@ -30,6 +35,9 @@ class Config:
     # Keep DATABASE_PATH for backward compatibility if needed, but we should rely on URI
     DATABASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database.db')
     
+    # Redis for state shared between gunicorn workers (session token cache); optional
+    REDIS_URL = os.environ.get('REDIS_URL') or os.environ.get('KV_URL')
+
     # Anthropic API settings
     ANTHROPIC_API_KEY = os.environ.get('ANTHROPIC_API_KEY', '')
     AI_MODEL = 'claude-sonnet-4-20250514'
@@ -54,6 +62,19 @@ class Config:
     # Default AI provider (options: 'gemini', 'groq', 'together', 'openrouter', 'anthropic', 'mock')
     DEFAULT_AI_PROVIDER = os.environ.get('DEFAULT_AI_PROVIDER', 'openrouter')
     
+    # Send each request to two configured providers at once and keep the first
+    # usable answer. Lowers tail latency but roughly doubles token spend.
+    RACE_PROVIDERS = os.environ.get('RACE_PROVIDERS', 'False').lower() == 'true'
+    
+    # Requests that don't name a provider and whose requirements are estimated at
+    # more than LARGE_PROMPT_TOKENS go to LARGE_PROMPT_PROVIDER (e.g. a long-context
+    # paid model) instead of DEFAULT_AI_PROVIDER. Unset keeps everything on the default.
+    LARGE_PROMPT_PROVIDER = os.environ.get('LARGE_PROMPT_PROVIDER', '')
+    LARGE_PROMPT_TOKENS = int(os.environ.get('LARGE_PROMPT_TOKENS', '8000'))
+    
+    # Background threads per process for /api/generate/async
+    GENERATION_WORKERS = int(os.environ.get('GENERATION_WORKERS', '8'))
+    
     # File upload settings
     # use /tmp for serverless environments (Vercel)
     if os.environ.get('VERCEL'):
@@ -62,7 +83,11 @@ class Config:
         UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
         
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
-    ALLOWED_EXTENSIONS = {'pdf', 'docx', 'txt'}
+    ALLOWED_EXTENSIONS = frozenset({'pdf', 'docx', 'txt'})
+    
+    # Password hashing: bcrypt work factor (each step doubles the cost).
+    # Set BCRYPT_ROUNDS=4 in test runs to keep signups fast.
+    BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '10'))
     
     # Token settings
     TOKEN_EXPIRY_HOURS = 24
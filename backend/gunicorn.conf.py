@@ -0,0 +1,30 @@
+import os
+import multiprocessing
+
+# Gunicorn settings for running the backend in production:
+#   gunicorn -c gunicorn.conf.py app:app
+#
+# AI provider calls block for several seconds each, so gthread workers are used:
+# each worker serves requests on a pool of real OS threads and keeps several
+# upstream calls open at once. Real threads also let the password-hashing pool
+# in models/user.py run Argon2/bcrypt in parallel; gevent would monkey-patch it
+# into greenlets that block the whole worker during every hash.
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+
+# Generation (and batch submission) can take well over the default 30s
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_worker_init(worker):
+    # Build the AI service in each worker before it accepts requests
+    from routes.generate import get_ai_service
+    get_ai_service()
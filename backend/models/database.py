@@ -1,22 +1,87 @@
 import os
-from sqlalchemy import create_engine, MetaData, Table, Column, Integer, String, Text, ForeignKey, DateTime
+import threading
+from sqlalchemy import create_engine, event, inspect, text, MetaData, Table, Column, Index, Integer, String, Text, LargeBinary, ForeignKey, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.sql import func
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
 from config import Config
+from utils.helpers import encode_json_blob, decode_json_blob
 
 # Create engine
-# Use NullPool for Vercel/Serverless to prevent connection issues with frozen processes
+# Use NullPool for Vercel/Serverless to prevent connection issues with frozen processes.
+# Long-running servers keep a pool of database connections (pre-pinged and recycled
+# so a dropped or idle-timed-out connection is replaced instead of failing a request).
+# A local SQLite file has no server connection to go stale, so its connections are
+# pooled and shared across threads instead of reopening the file on every query.
 try:
-    engine = create_engine(
-        Config.SQLALCHEMY_DATABASE_URI, 
-        poolclass=NullPool
-    )
+    if Config.SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+        # An in-memory database only exists on its one connection, so it must be shared
+        in_memory = Config.SQLALCHEMY_DATABASE_URI in ('sqlite://', 'sqlite:///:memory:')
+        engine = create_engine(
+            Config.SQLALCHEMY_DATABASE_URI,
+            connect_args={'check_same_thread': False},
+            **({'poolclass': StaticPool} if in_memory else
+               {'poolclass': QueuePool, 'pool_size': 10})
+        )
+    elif os.environ.get('VERCEL'):
+        engine = create_engine(
+            Config.SQLALCHEMY_DATABASE_URI, 
+            poolclass=NullPool
+        )
+    else:
+        engine = create_engine(
+            Config.SQLALCHEMY_DATABASE_URI,
+            poolclass=QueuePool,
+            pool_size=20,
+            max_overflow=10,
+            pool_pre_ping=True,
+            pool_recycle=1800
+        )
 except Exception as e:
     print(f"CRITICAL: Failed to create DB engine: {e}")
     engine = None
 
+if engine is not None and engine.dialect.name == 'sqlite':
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers run alongside a writer; NORMAL skips the fsync per commit
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+        cursor.execute('PRAGMA mmap_size=268435456')
+        cursor.close()
+
 metadata = MetaData()
 
+
+class JSONDocument(TypeDecorator):
+    """
+    JSON value column: native JSONB on Postgres, zstd-compressed JSON bytes elsewhere.
+    
+    Callers bind and read plain Python objects either way.
+    """
+    
+    impl = LargeBinary
+    cache_ok = True
+    
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(JSONB())
+        return dialect.type_descriptor(LargeBinary())
+    
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name == 'postgresql':
+            return value
+        return encode_json_blob(value)
+    
+    def process_result_value(self, value, dialect):
+        if value is None or dialect.name == 'postgresql':
+            return value
+        return decode_json_blob(value)
+
+
 # Define tables
 users = Table('users', metadata,
     Column('id', Integer, primary_key=True),
@@ -31,7 +96,7 @@ generated_files = Table('generated_files', metadata,
     Column('user_id', Integer, ForeignKey('users.id'), nullable=False),
     Column('filename', String, nullable=False),
     Column('requirements', Text),
-    Column('test_cases', Text, nullable=False), # Stores JSON string
+    Column('test_cases', JSONDocument, nullable=False), # JSONB on Postgres, compressed JSON bytes elsewhere
     Column('project_type', String, nullable=False),
     Column('created_at', DateTime, server_default=func.now())
 )
@@ -40,14 +105,86 @@ sessions = Table('sessions', metadata,
     Column('id', Integer, primary_key=True),
     Column('user_id', Integer, ForeignKey('users.id'), nullable=False),
     Column('token', String, unique=True, nullable=False),
-    Column('expires_at', DateTime, nullable=False),
+    Column('expires_at', Integer, nullable=False),  # unix epoch seconds
     Column('created_at', DateTime, server_default=func.now())
 )
 
+# sessions.token is UNIQUE, which already gives it an index.
+# One session per user; the unique index is also the conflict target for the login upsert.
+Index('ux_sessions_user_id', sessions.c.user_id, unique=True)
+Index('ix_sessions_expires_at', sessions.c.expires_at)
+
+# History lists a user's files newest first
+Index('ix_gf_user_created', generated_files.c.user_id, generated_files.c.created_at.desc())
+
+# Long-running provider batch jobs, so results can be collected after a worker restart
+batch_jobs = Table('batch_jobs', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('users.id'), nullable=False),
+    Column('batch_id', String, unique=True, nullable=False),
+    Column('jobs', Text, nullable=False), # Stores JSON string
+    Column('status', String, nullable=False),
+    Column('file_ids', Text), # Stores JSON string once the batch has ended
+    Column('created_at', DateTime, server_default=func.now())
+)
+
+# Single generations queued through /api/generate/async, polled by job id from any worker
+generation_jobs = Table('generation_jobs', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('users.id'), nullable=False),
+    Column('job_id', String, unique=True, nullable=False),
+    Column('status', String, nullable=False),
+    Column('file_id', Integer, ForeignKey('generated_files.id')),
+    Column('filename', String),
+    Column('error', String),
+    Column('created_at', DateTime, server_default=func.now())
+)
+
+# init_db runs create_all at most once per process
+_INIT_LOCK = threading.Lock()
+_DB_READY = False
+
+def _migrate_sessions(conn):
+    """Drop a sessions table that still stores expires_at as DATETIME; create_all rebuilds it."""
+    inspector = inspect(conn)
+    if not inspector.has_table('sessions'):
+        return
+    for column in inspector.get_columns('sessions'):
+        if column['name'] == 'expires_at' and not isinstance(column['type'], Integer):
+            # Sessions are disposable: affected users simply sign in again
+            sessions.drop(conn)
+            return
+
+def _migrate_test_cases_blob(conn):
+    """Convert a Postgres TEXT test_cases column to JSONB; SQLite reads old text rows as-is."""
+    if conn.dialect.name != 'postgresql':
+        return
+    inspector = inspect(conn)
+    if not inspector.has_table('generated_files'):
+        return
+    for column in inspector.get_columns('generated_files'):
+        if column['name'] == 'test_cases' and isinstance(column['type'], Text):
+            conn.execute(text(
+                "ALTER TABLE generated_files ALTER COLUMN test_cases TYPE jsonb "
+                "USING test_cases::jsonb"
+            ))
+            return
+
 def init_db():
     """Initialize the database (create tables)."""
-    with engine.begin() as conn:
-        metadata.create_all(conn)
+    global _DB_READY
+    with _INIT_LOCK:
+        if _DB_READY:
+            return
+        with engine.begin() as conn:
+            _migrate_sessions(conn)
+            _migrate_test_cases_blob(conn)
+            metadata.create_all(conn)
+            # create_all skips tables that already exist, so add new indexes to them here
+            for table in metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
+        _DB_READY = True
     print("Database initialized successfully!")
 
 def get_db_connection():
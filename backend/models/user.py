@@ -1,7 +1,68 @@
+import os
+import time
+import threading
 import bcrypt
-from datetime import datetime
-from sqlalchemy import select
-from .database import engine, users
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import select, bindparam
+from .database import engine, users, sessions
+from config import Config
+from utils.helpers import get_bcrypt_salt
+
+# Optional Argon2 import (bcrypt is kept for existing hashes)
+try:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import VerifyMismatchError, InvalidHashError
+    ARGON2_AVAILABLE = True
+except ImportError:
+    ARGON2_AVAILABLE = False
+
+# Argon2id hasher for new passwords; hashes are self-describing ($argon2id$...)
+_ph = PasswordHasher(time_cost=3, memory_cost=65536, parallelism=2) if ARGON2_AVAILABLE else None
+
+# bcrypt and argon2-cffi release the GIL while hashing, so concurrent logins
+# and signups run on separate cores instead of queueing on the request threads
+_hash_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='pwhash')
+
+
+def _hash_password_sync(password: str) -> str:
+    if _ph:
+        return _ph.hash(password)
+    salt = get_bcrypt_salt(Config.BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+
+def _verify_password_sync(password: str, password_hash: str) -> bool:
+    if password_hash.startswith('$argon2'):
+        if not _ph:
+            return False
+        try:
+            return _ph.verify(password_hash, password)
+        except (VerifyMismatchError, InvalidHashError):
+            return False
+    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+# Short-lived cache of users looked up by email (logins in quick succession skip the SELECT)
+EMAIL_CACHE_TTL_SECONDS = 30
+EMAIL_CACHE_MAX_ENTRIES = 4096
+_email_cache = OrderedDict()  # {email: (expires_at, User)}, least recently used first
+_email_cache_lock = threading.Lock()
+
+# Same for lookups by id, which every authenticated request makes
+ID_CACHE_TTL_SECONDS = 30
+ID_CACHE_MAX_ENTRIES = 5000
+_id_cache = OrderedDict()  # {user_id: (expires_at, User)}, least recently used first
+_id_cache_lock = threading.Lock()
+
+
+# Lookup statements built once; values are bound at execution
+_FIND_BY_EMAIL_STMT = select(users).where(users.c.email == bindparam('email'))
+_FIND_BY_ID_STMT = select(users).where(users.c.id == bindparam('user_id'))
+_FIND_BY_TOKEN_STMT = (
+    select(users, sessions.c.expires_at)
+    .join(sessions, sessions.c.user_id == users.c.id)
+    .where(sessions.c.token == bindparam('token'), sessions.c.expires_at > bindparam('now'))
+)
 
 
 class User:
@@ -16,79 +77,148 @@ class User:
     
     @staticmethod
     def hash_password(password: str) -> str:
-        """Hash a password using bcrypt."""
-        salt = bcrypt.gensalt()
-        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+        """Hash a password using Argon2id (bcrypt if argon2-cffi is not installed)."""
+        return _hash_pool.submit(_hash_password_sync, password).result()
     
     @staticmethod
     def verify_password(password: str, password_hash: str) -> bool:
-        """Verify a password against its hash."""
-        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+        """Verify a password against its Argon2 or legacy bcrypt hash."""
+        return _hash_pool.submit(_verify_password_sync, password, password_hash).result()
+    
+    @staticmethod
+    def password_needs_rehash(password_hash: str) -> bool:
+        """True for legacy bcrypt hashes or Argon2 hashes with outdated parameters."""
+        if not _ph:
+            return False
+        if not password_hash.startswith('$argon2'):
+            return True
+        return _ph.check_needs_rehash(password_hash)
+    
+    def update_password_hash(self, password_hash: str) -> None:
+        """Store a new password hash for this user."""
+        with engine.begin() as conn:
+            conn.execute(
+                users.update().where(users.c.id == self.id).values(password_hash=password_hash)
+            )
+        self.password_hash = password_hash
+        with _email_cache_lock:
+            _email_cache.pop(self.email, None)
+        with _id_cache_lock:
+            _id_cache.pop(self.id, None)
     
     @staticmethod
     def create(name: str, email: str, password: str) -> 'User':
         """Create a new user in the database."""
         password_hash = User.hash_password(password)
         
-        try:
-            with engine.connect() as conn:
-                # Insert user
-                stmt = users.insert().values(
-                    name=name,
-                    email=email,
-                    password_hash=password_hash
-                )
-                result = conn.execute(stmt)
-                conn.commit()
-                
-                # Get ID
-                user_id = result.inserted_primary_key[0]
-                
-                return User(
-                    id=user_id,
-                    name=name,
-                    email=email,
-                    password_hash=password_hash,
-                    created_at=datetime.now()
-                )
-        except Exception as e:
-            raise e
+        # One transaction; generated id and created_at come back with the INSERT
+        with engine.begin() as conn:
+            stmt = users.insert().values(
+                name=name,
+                email=email,
+                password_hash=password_hash
+            ).returning(users.c.id, users.c.created_at)
+            row = conn.execute(stmt).one()
+        
+        with _email_cache_lock:
+            _email_cache.pop(email, None)
+        
+        return User(
+            id=row.id,
+            name=name,
+            email=email,
+            password_hash=password_hash,
+            created_at=row.created_at
+        )
     
     @staticmethod
     def find_by_email(email: str) -> 'User':
         """Find a user by their email address."""
+        now = time.monotonic()
+        with _email_cache_lock:
+            entry = _email_cache.get(email)
+            if entry is not None:
+                if entry[0] > now:
+                    _email_cache.move_to_end(email)
+                    return entry[1]
+                del _email_cache[email]
+        
         with engine.connect() as conn:
-            stmt = select(users).where(users.c.email == email)
-            result = conn.execute(stmt)
+            result = conn.execute(_FIND_BY_EMAIL_STMT, {'email': email})
             row = result.first()
-            
-            if row:
-                return User(
-                    id=row.id,
-                    name=row.name,
-                    email=row.email,
-                    password_hash=row.password_hash,
-                    created_at=row.created_at
-                )
-        return None
+        
+        if not row:
+            return None
+        
+        user = User(
+            id=row.id,
+            name=row.name,
+            email=row.email,
+            password_hash=row.password_hash,
+            created_at=row.created_at
+        )
+        with _email_cache_lock:
+            _email_cache[email] = (now + EMAIL_CACHE_TTL_SECONDS, user)
+            _email_cache.move_to_end(email)
+            while len(_email_cache) > EMAIL_CACHE_MAX_ENTRIES:
+                _email_cache.popitem(last=False)
+        return user
     
     @staticmethod
     def find_by_id(user_id: int) -> 'User':
         """Find a user by their ID."""
+        now = time.monotonic()
+        with _id_cache_lock:
+            entry = _id_cache.get(user_id)
+            if entry is not None:
+                if entry[0] > now:
+                    _id_cache.move_to_end(user_id)
+                    return entry[1]
+                del _id_cache[user_id]
+        
+        with engine.connect() as conn:
+            result = conn.execute(_FIND_BY_ID_STMT, {'user_id': user_id})
+            row = result.first()
+        
+        if not row:
+            return None
+        
+        user = User(
+            id=row.id,
+            name=row.name,
+            email=row.email,
+            password_hash=row.password_hash,
+            created_at=row.created_at
+        )
+        with _id_cache_lock:
+            _id_cache[user_id] = (now + ID_CACHE_TTL_SECONDS, user)
+            _id_cache.move_to_end(user_id)
+            while len(_id_cache) > ID_CACHE_MAX_ENTRIES:
+                _id_cache.popitem(last=False)
+        return user
+    
+    @staticmethod
+    def find_by_token(token: str) -> 'User':
+        """Find the user owning an unexpired session token.
+        
+        The session's expiry is kept on the returned user as ``session_expires_at``.
+        """
         with engine.connect() as conn:
-            stmt = select(users).where(users.c.id == user_id)
-            result = conn.execute(stmt)
+            result = conn.execute(_FIND_BY_TOKEN_STMT, {'token': token, 'now': int(time.time())})
             row = result.first()
-            
-            if row:
-                return User(
-                    id=row.id,
-                    name=row.name,
-                    email=row.email,
-                    password_hash=row.password_hash,
-                    created_at=row.created_at
-                )
-        return None
+        
+        if not row:
+            return None
+        
+        user = User(
+            id=row.id,
+            name=row.name,
+            email=row.email,
+            password_hash=row.password_hash,
+            created_at=row.created_at
+        )
+        user.session_expires_at = row.expires_at
+        return user
     
     def to_dict(self) -> dict:
         """Convert user to dictionary (excluding password)."""
@@ -1,64 +1,197 @@
 from flask import Blueprint, request, jsonify
+import time
+import hmac
+import base64
+import struct
+import hashlib
 import secrets
-from datetime import datetime, timedelta
-from sqlalchemy import select, delete
+import binascii
+import threading
+from collections import OrderedDict
+from sqlalchemy import delete, bindparam
+from sqlalchemy.exc import IntegrityError
 from models.user import User
 from models.database import engine, sessions
 from config import Config
 
+# Optional Redis import (token cache shared across gunicorn workers)
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+if engine is not None and engine.dialect.name == 'postgresql':
+    from sqlalchemy.dialects.postgresql import insert as upsert_insert
+else:
+    from sqlalchemy.dialects.sqlite import insert as upsert_insert
+
+# Session statements built once; values are bound at execution.
+# Login creates the session, replacing any existing one for this user.
+_upsert = upsert_insert(sessions)
+_UPSERT_SESSION_STMT = _upsert.on_conflict_do_update(
+    index_elements=[sessions.c.user_id],
+    set_={'token': _upsert.excluded.token, 'expires_at': _upsert.excluded.expires_at}
+)
+_DELETE_SESSION_STMT = delete(sessions).where(sessions.c.token == bindparam('token'))
+
 auth_bp = Blueprint('auth', __name__)
 
+# Session tokens are signed: base64url(user_id:8 || expires_at:8 || nonce:8 || hmac_sha256[:16]).
+# Forged, truncated or expired tokens are rejected without touching the database;
+# the sessions table is still consulted (through the cache below) for logout/relogin revocation.
+_TOKEN_KEY = hashlib.sha256(b'session-token:' + Config.SECRET_KEY.encode('utf-8')).digest()
+_TOKEN_PAYLOAD = struct.Struct('>QQ8s')
+_TOKEN_MAC_BYTES = 16
+_TOKEN_BYTES = _TOKEN_PAYLOAD.size + _TOKEN_MAC_BYTES
 
-def create_session_token(user_id: int) -> str:
-    """Create a new session token for a user."""
-    token = secrets.token_hex(32)
-    expires_at = datetime.now() + timedelta(hours=Config.TOKEN_EXPIRY_HOURS)
+# token -> (user_id, expires_at) cache so authenticated requests skip the sessions SELECT.
+# With REDIS_URL set the cache lives in Redis, so a logout or relogin handled by one
+# gunicorn worker revokes the token in every worker at once. Without Redis each worker
+# keeps its own cache, and another worker may accept a revoked token for up to
+# LOCAL_TOKEN_CACHE_TTL_SECONDS. Keys are blake2b digests so raw tokens are not stored.
+TOKEN_CACHE_TTL_SECONDS = 60
+LOCAL_TOKEN_CACHE_TTL_SECONDS = 5
+TOKEN_CACHE_MAX_ENTRIES = 10000
+_token_cache = OrderedDict()  # {digest: (cached_until, user_id, expires_at)}, least recently used first
+_token_keys_by_user = {}  # {user_id: digest} - one live session per user
+_token_cache_lock = threading.Lock()
+
+redis_client = None
+if REDIS_AVAILABLE and Config.REDIS_URL:
+    try:
+        redis_client = redis.Redis.from_url(Config.REDIS_URL, decode_responses=True)
+    except Exception as e:
+        print(f"Redis init failed: {e}. Falling back to per-worker token cache.")
+        redis_client = None
+
+
+def _token_cache_key(token: str) -> str:
+    return hashlib.blake2b(token.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _invalidate_user_tokens(user_id: int) -> None:
+    if redis_client:
+        # sess_user:<id> names the user's cached session; drop both keys
+        try:
+            key = redis_client.getdel(f'sess_user:{user_id}')
+            if key:
+                redis_client.delete(f'sess:{key}')
+        except redis.RedisError as e:
+            print(f"Token cache invalidation failed: {e}")
+        return
     
-    with engine.connect() as conn:
-        # Remove any existing sessions for this user
-        conn.execute(
-            delete(sessions).where(sessions.c.user_id == user_id)
-        )
-        
-        # Create new session
-        conn.execute(
-            sessions.insert().values(
-                user_id=user_id,
-                token=token,
-                expires_at=expires_at
-            )
-        )
-        conn.commit()
+    with _token_cache_lock:
+        key = _token_keys_by_user.pop(user_id, None)
+        if key is not None:
+            _token_cache.pop(key, None)
+
+
+def _invalidate_token(token: str) -> None:
+    key = _token_cache_key(token)
+    if redis_client:
+        try:
+            redis_client.delete(f'sess:{key}')
+        except redis.RedisError as e:
+            print(f"Token cache invalidation failed: {e}")
+        return
     
-    return token
+    with _token_cache_lock:
+        entry = _token_cache.pop(key, None)
+        if entry and _token_keys_by_user.get(entry[1]) == key:
+            del _token_keys_by_user[entry[1]]
 
 
-def validate_token(token: str) -> int:
-    """Validate a session token and return user_id if valid."""
-    if not token:
+def _sign_token(user_id: int, expires_at: int) -> str:
+    payload = _TOKEN_PAYLOAD.pack(user_id, expires_at, secrets.token_bytes(8))
+    mac = hmac.new(_TOKEN_KEY, payload, hashlib.sha256).digest()[:_TOKEN_MAC_BYTES]
+    return base64.urlsafe_b64encode(payload + mac).rstrip(b'=').decode('ascii')
+
+
+def _verify_token(token: str):
+    """Return the user_id a token was signed for, or None if it is malformed, forged or expired."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+    except (binascii.Error, ValueError):
+        return None
+    if len(raw) != _TOKEN_BYTES:
         return None
     
-    with engine.connect() as conn:
-        stmt = select(sessions.c.user_id, sessions.c.expires_at).where(sessions.c.token == token)
-        result = conn.execute(stmt)
-        row = result.first()
+    payload, mac = raw[:_TOKEN_PAYLOAD.size], raw[_TOKEN_PAYLOAD.size:]
+    expected = hmac.new(_TOKEN_KEY, payload, hashlib.sha256).digest()[:_TOKEN_MAC_BYTES]
+    if not hmac.compare_digest(mac, expected):
+        return None
     
-    if not row:
+    user_id, expires_at, _ = _TOKEN_PAYLOAD.unpack(payload)
+    if expires_at < time.time():
         return None
+    return user_id
+
+
+def create_session_token(user_id: int) -> str:
+    """Create a new signed session token for a user."""
+    expires_at = int(time.time()) + Config.TOKEN_EXPIRY_HOURS * 3600  # unix epoch seconds
+    token = _sign_token(user_id, expires_at)
     
-    # Handle datetime conversion if necessary (SQLAlchemy usually handles this, but just in case)
-    expires_at = row.expires_at
-    if isinstance(expires_at, str):
+    with engine.begin() as conn:
+        conn.execute(_UPSERT_SESSION_STMT, {'user_id': user_id, 'token': token, 'expires_at': expires_at})
+    
+    _invalidate_user_tokens(user_id)
+    return token
+
+
+def _cached_user_id(token: str):
+    """Return the cached user_id for a token, or None on a cache miss or expired session."""
+    key = _token_cache_key(token)
+    if redis_client:
+        # Value is "<user_id>|<expires_at>"; a Redis failure is treated as a miss
         try:
-            expires_at = datetime.fromisoformat(expires_at)
-        except ValueError:
-            # Fallback for some SQLite formats
-            expires_at = datetime.strptime(expires_at, '%Y-%m-%d %H:%M:%S.%f')
-            
-    if expires_at < datetime.now():
-        return None
+            value = redis_client.get(f'sess:{key}')
+        except redis.RedisError:
+            return None
+        if not value:
+            return None
+        user_id, expires_at = map(int, value.split('|', 1))
+        return user_id if expires_at >= time.time() else None
+    
+    with _token_cache_lock:
+        entry = _token_cache.get(key)
+        if not entry or entry[0] <= time.monotonic():
+            return None
+        _token_cache.move_to_end(key)
+    _, user_id, expires_at = entry
+    return user_id if expires_at >= time.time() else None
+
+
+def _cache_token(token: str, user_id: int, expires_at: int) -> None:
+    key = _token_cache_key(token)
+    if redis_client:
+        try:
+            with redis_client.pipeline() as pipe:
+                pipe.setex(f'sess:{key}', TOKEN_CACHE_TTL_SECONDS, f'{user_id}|{expires_at}')
+                pipe.setex(f'sess_user:{user_id}', TOKEN_CACHE_TTL_SECONDS, key)
+                pipe.execute()
+        except redis.RedisError as e:
+            print(f"Token cache write failed: {e}")
+        return
     
-    return row.user_id
+    with _token_cache_lock:
+        _token_cache[key] = (time.monotonic() + LOCAL_TOKEN_CACHE_TTL_SECONDS, user_id, expires_at)
+        _token_cache.move_to_end(key)
+        _token_keys_by_user[user_id] = key
+        if len(_token_cache) > TOKEN_CACHE_MAX_ENTRIES:
+            _, (_, old_user_id, _) = _token_cache.popitem(last=False)
+            if _token_keys_by_user.get(old_user_id) not in _token_cache:
+                _token_keys_by_user.pop(old_user_id, None)
+
+
+def _user_for_token(token: str, user_id: int):
+    """Resolve a token to its User with a single sessions JOIN users query."""
+    user = User.find_by_token(token)
+    if not user or user.id != user_id:
+        return None
+    _cache_token(token, user.id, user.session_expires_at)
+    return user
 
 
 def get_current_user():
@@ -68,11 +201,14 @@ def get_current_user():
         return None
     
     token = auth_header[7:]  # Remove 'Bearer ' prefix
-    user_id = validate_token(token)
+    user_id = _verify_token(token) if token else None
+    if not user_id:
+        return None
     
-    if user_id:
+    # Cached sessions only need the users lookup; otherwise one joined query does both
+    if _cached_user_id(token) == user_id:
         return User.find_by_id(user_id)
-    return None
+    return _user_for_token(token, user_id)
 
 
 @auth_bp.route('/api/signup', methods=['POST'])
@@ -101,14 +237,12 @@ def signup():
         if '@' not in email or '.' not in email:
             return jsonify({'error': 'Invalid email format'}), 400
         
-        # Check if user already exists
-        existing_user = User.find_by_email(email)
-        if existing_user:
+        # Create user; the UNIQUE email constraint rejects duplicates in the same statement
+        try:
+            user = User.create(name, email, password)
+        except IntegrityError:
             return jsonify({'error': 'Email already registered'}), 409
         
-        # Create user
-        user = User.create(name, email, password)
-        
         # Create session token
         token = create_session_token(user.id)
         
@@ -150,6 +284,13 @@ def login():
         if not User.verify_password(password, user.password_hash):
             return jsonify({'error': 'Invalid email or password'}), 401
         
+        # Upgrade legacy bcrypt / outdated Argon2 hashes on successful login
+        if User.password_needs_rehash(user.password_hash):
+            try:
+                user.update_password_hash(User.hash_password(password))
+            except Exception as e:
+                print(f"Password rehash failed: {e}")
+        
         # Create session token
         token = create_session_token(user.id)
         
@@ -172,11 +313,9 @@ def logout():
         if auth_header.startswith('Bearer '):
             token = auth_header[7:]
             
-            with engine.connect() as conn:
-                conn.execute(
-                    delete(sessions).where(sessions.c.token == token)
-                )
-                conn.commit()
+            with engine.begin() as conn:
+                conn.execute(_DELETE_SESSION_STMT, {'token': token})
+            _invalidate_token(token)
         
         return jsonify({'message': 'Logged out successfully'}), 200
         
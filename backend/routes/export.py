@@ -1,26 +1,56 @@
 import os
-import json
 import csv
 import io
+import tempfile
 from datetime import datetime
 from flask import Blueprint, request, jsonify, send_file, Response
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from sqlalchemy import select, delete, desc
+from sqlalchemy import select, delete, desc, bindparam
 from routes.auth import get_current_user
 from models.database import engine, generated_files
 
 export_bp = Blueprint('export', __name__)
 
+# Export layout, built once at import and shared by every download
+EXPORT_HEADERS = [
+    "Test ID", "Module", "Test Scenario", "Preconditions", 
+    "Steps", "Test Data", "Expected Result", "Actual Result",
+    "Status", "Priority", "Severity", "Edge Cases"
+]
+EXPORT_FIELDS = [  # (test case key, default) per column
+    ('test_id', ''), ('module', ''), ('test_scenario', ''), ('preconditions', ''),
+    ('steps', ''), ('test_data', ''), ('expected_result', ''), ('actual_result', ''),
+    ('status', 'Pending'), ('priority', ''), ('severity', ''), ('edge_cases', '')
+]
+CSV_STEPS_COLUMN = [key for key, _ in EXPORT_FIELDS].index('steps')
+EXCEL_COLUMN_WIDTHS = {chr(64 + col): width for col, width in
+                       enumerate([12, 20, 35, 25, 40, 20, 35, 20, 12, 12, 12, 30], 1)}
+
+# Excel styles
+EXCEL_HEADER_FONT = Font(bold=True, color="FFFFFF", size=11)
+EXCEL_HEADER_FILL = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+EXCEL_HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="center", wrap_text=True)
+EXCEL_CELL_ALIGNMENT = Alignment(horizontal="left", vertical="top", wrap_text=True)
+EXCEL_BORDER = Border(
+    left=Side(style='thin'),
+    right=Side(style='thin'),
+    top=Side(style='thin'),
+    bottom=Side(style='thin')
+)
+
+# Statements built once; SQLAlchemy caches their compiled form
+_GET_USER_FILE_STMT = select(generated_files.c.filename, generated_files.c.test_cases).where(
+    (generated_files.c.id == bindparam('file_id')) &
+    (generated_files.c.user_id == bindparam('user_id'))
+)
+
 
 def get_user_file(user_id: int, file_id: int):
-    """Get a file from the database if it belongs to the user."""
+    """Get a file's filename and test_cases if it belongs to the user."""
     with engine.connect() as conn:
-        stmt = select(generated_files).where(
-            (generated_files.c.id == file_id) &
-            (generated_files.c.user_id == user_id)
-        )
-        result = conn.execute(stmt)
+        result = conn.execute(_GET_USER_FILE_STMT, {'file_id': file_id, 'user_id': user_id})
         return result.first()
 
 
@@ -36,73 +66,41 @@ def download_excel(file_id):
         return jsonify({'error': 'File not found'}), 404
     
     try:
-        test_cases_data = json.loads(row.test_cases)
-        test_cases = test_cases_data.get('test_cases', [])
-        
-        # Create workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Test Cases"
+        test_cases = row.test_cases.get('test_cases', [])
         
-        # Define styles
-        header_font = Font(bold=True, color="FFFFFF", size=11)
-        header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-        
-        cell_alignment = Alignment(horizontal="left", vertical="top", wrap_text=True)
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-        
-        # Headers
-        headers = [
-            "Test ID", "Module", "Test Scenario", "Preconditions", 
-            "Steps", "Test Data", "Expected Result", "Actual Result",
-            "Status", "Priority", "Severity", "Edge Cases"
-        ]
-        
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-            cell.border = thin_border
-        
-        # Data rows
-        for row_num, tc in enumerate(test_cases, 2):
-            data = [
-                tc.get('test_id', ''),
-                tc.get('module', ''),
-                tc.get('test_scenario', ''),
-                tc.get('preconditions', ''),
-                tc.get('steps', ''),
-                tc.get('test_data', ''),
-                tc.get('expected_result', ''),
-                tc.get('actual_result', ''),
-                tc.get('status', 'Pending'),
-                tc.get('priority', ''),
-                tc.get('severity', ''),
-                tc.get('edge_cases', '')
-            ]
-            
-            for col, value in enumerate(data, 1):
-                cell = ws.cell(row=row_num, column=col, value=value)
-                cell.alignment = cell_alignment
-                cell.border = thin_border
+        # Write-only workbook: rows are streamed out as they are appended
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Test Cases")
         
-        # Adjust column widths
-        column_widths = [12, 20, 35, 25, 40, 20, 35, 20, 12, 12, 12, 30]
-        for col, width in enumerate(column_widths, 1):
-            ws.column_dimensions[chr(64 + col)].width = width
+        # Column widths and frozen header must be set before the first append
+        for letter, width in EXCEL_COLUMN_WIDTHS.items():
+            ws.column_dimensions[letter].width = width
         
         # Freeze header row
         ws.freeze_panes = 'A2'
         
-        # Save to bytes
-        output = io.BytesIO()
+        header_row = []
+        for header in EXPORT_HEADERS:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.font = EXCEL_HEADER_FONT
+            cell.fill = EXCEL_HEADER_FILL
+            cell.alignment = EXCEL_HEADER_ALIGNMENT
+            cell.border = EXCEL_BORDER
+            header_row.append(cell)
+        ws.append(header_row)
+        
+        # Data rows
+        for tc in test_cases:
+            data_row = []
+            for key, default in EXPORT_FIELDS:
+                cell = WriteOnlyCell(ws, value=tc.get(key, default))
+                cell.alignment = EXCEL_CELL_ALIGNMENT
+                cell.border = EXCEL_BORDER
+                data_row.append(cell)
+            ws.append(data_row)
+        
+        # Spill large workbooks to disk; send_file streams the file out in chunks
+        output = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
         wb.save(output)
         output.seek(0)
         
@@ -120,6 +118,13 @@ def download_excel(file_id):
         return jsonify({'error': 'Error generating Excel file'}), 500
 
 
+def _flatten_steps(steps) -> str:
+    """Put a test case's steps on one CSV line; models return them as a string or a list."""
+    if isinstance(steps, list):
+        return ' | '.join(str(step) for step in steps)
+    return str(steps).replace('\n', ' | ')
+
+
 @export_bp.route('/api/download/csv/<int:file_id>', methods=['GET'])
 def download_csv(file_id):
     """Download test cases as CSV file."""
@@ -132,46 +137,35 @@ def download_csv(file_id):
         return jsonify({'error': 'File not found'}), 404
     
     try:
-        test_cases_data = json.loads(row.test_cases)
-        test_cases = test_cases_data.get('test_cases', [])
+        test_cases = row.test_cases.get('test_cases', [])
         
-        # Create CSV in memory
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Headers
-        headers = [
-            "Test ID", "Module", "Test Scenario", "Preconditions", 
-            "Steps", "Test Data", "Expected Result", "Actual Result",
-            "Status", "Priority", "Severity", "Edge Cases"
-        ]
-        writer.writerow(headers)
-        
-        # Data rows
+        # Build every row up front so a malformed test case still gets the JSON 500
+        # below instead of failing after the 200 headers have gone out
+        rows = []
         for tc in test_cases:
-            writer.writerow([
-                tc.get('test_id', ''),
-                tc.get('module', ''),
-                tc.get('test_scenario', ''),
-                tc.get('preconditions', ''),
-                tc.get('steps', '').replace('\n', ' | '),
-                tc.get('test_data', ''),
-                tc.get('expected_result', ''),
-                tc.get('actual_result', ''),
-                tc.get('status', 'Pending'),
-                tc.get('priority', ''),
-                tc.get('severity', ''),
-                tc.get('edge_cases', '')
-            ])
-        
-        # Get CSV content
-        csv_content = output.getvalue()
-        output.close()
+            values = [tc.get(key, default) for key, default in EXPORT_FIELDS]
+            values[CSV_STEPS_COLUMN] = _flatten_steps(values[CSV_STEPS_COLUMN])
+            rows.append(values)
+        
+        def generate_rows():
+            # Reuse one small buffer and yield each row as soon as it is written
+            output = io.StringIO()
+            writer = csv.writer(output)
+            writer.writerow(EXPORT_HEADERS)
+            yield output.getvalue()
+            
+            # Data rows
+            for values in rows:
+                output.seek(0)
+                output.truncate()
+                writer.writerow(values)
+                yield output.getvalue()
+            output.close()
         
         filename = f"{row.filename}.csv"
         
         return Response(
-            csv_content,
+            generate_rows(),
             mimetype='text/csv',
             headers={
                 'Content-Disposition': f'attachment; filename={filename}'
@@ -222,13 +216,12 @@ def delete_history_item(file_id):
     if not user:
         return jsonify({'error': 'Unauthorized'}), 401
     
-    with engine.connect() as conn:
+    with engine.begin() as conn:
         stmt = delete(generated_files).where(
             (generated_files.c.id == file_id) & 
             (generated_files.c.user_id == user.id)
         )
         result = conn.execute(stmt)
-        conn.commit()
     
     if result.rowcount > 0:
         return jsonify({'message': 'File deleted successfully'}), 200
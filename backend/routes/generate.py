@@ -1,18 +1,38 @@
 import os
-import json
-from datetime import datetime
-from flask import Blueprint, request, jsonify
-from werkzeug.utils import secure_filename
-from sqlalchemy import select
+import time
+import secrets
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from sqlalchemy import select, bindparam
 from routes.auth import get_current_user
 from services.ai_service import AIService
 from services.file_parser import FileParser
-from models.database import engine, generated_files
+from models.database import engine, generated_files, batch_jobs, generation_jobs
+from utils.helpers import json_dumps, json_loads
 from config import Config
 
 generate_bp = Blueprint('generate', __name__)
 _ai_service = None
 
+MAX_BATCH_JOBS = 100
+
+# Characters of the requirements kept with each generated file
+REQUIREMENTS_PREVIEW_CHARS = 1000
+
+# Request bodies the generate routes know how to read
+_ACCEPTED_MIMETYPES = frozenset({'application/json', 'multipart/form-data'})
+
+# Background threads for /api/generate/async; the AI call is network-bound
+_generation_executor = ThreadPoolExecutor(max_workers=Config.GENERATION_WORKERS, thread_name_prefix='generate')
+
+# Statements built once; SQLAlchemy caches their compiled form
+_INSERT_FILE_STMT = generated_files.insert()
+_GET_FILE_STMT = select(generated_files).where(
+    (generated_files.c.id == bindparam('file_id')) &
+    (generated_files.c.user_id == bindparam('user_id'))
+)
+
 def get_ai_service():
     """Lazy load the AI service to prevent startup crashes."""
     global _ai_service
@@ -25,6 +45,30 @@ def get_ai_service():
     return _ai_service
 
 
+@generate_bp.before_request
+def reject_unreadable_bodies():
+    """Turn away oversized or unsupported POST bodies from their headers, before any of the body is read."""
+    if request.method != 'POST':
+        return None
+
+    length = request.content_length
+    if length is not None and length > Config.MAX_CONTENT_LENGTH:
+        return jsonify({'error': 'File too large. Maximum size is 16MB'}), 413
+
+    if length and request.mimetype not in _ACCEPTED_MIMETYPES:
+        return jsonify({'error': 'Unsupported content type. Send JSON or multipart/form-data'}), 415
+    return None
+
+
+@functools.lru_cache(maxsize=1)
+def _providers_response_body(service) -> bytes:
+    # The provider list is fixed when AIService binds its keys, so encode it once
+    return current_app.json.dumps({
+        'providers': service.get_available_providers(),
+        'default': Config.DEFAULT_AI_PROVIDER
+    }).encode('utf-8')
+
+
 @generate_bp.route('/api/providers', methods=['GET'])
 def get_providers():
     """Get list of available AI providers."""
@@ -36,30 +80,90 @@ def get_providers():
             'default': 'mock'
         }), 200
         
-    providers = service.get_available_providers()
-    return jsonify({
-        'providers': providers,
-        'default': Config.DEFAULT_AI_PROVIDER
-    }), 200
+    return current_app.response_class(
+        _providers_response_body(service), status=200, mimetype='application/json'
+    )
+
+
+def _generated_filename(project_type: str) -> str:
+    """Name a generated file by project type, millisecond timestamp and a random suffix."""
+    # Unique within the same second, unlike the old %Y%m%d_%H%M%S stamp
+    return f"test_cases_{project_type.lower()}_{int(time.time() * 1000):x}_{secrets.token_hex(3)}"
 
 
 def save_generated_file(user_id: int, filename: str, requirements: str, 
                         test_cases: dict, project_type: str) -> int:
     """Save generated test cases to the database."""
-    with engine.connect() as conn:
-        stmt = generated_files.insert().values(
-            user_id=user_id,
-            filename=filename,
-            requirements=requirements,
-            test_cases=json.dumps(test_cases),
-            project_type=project_type
-        )
-        result = conn.execute(stmt)
-        conn.commit()
+    with engine.begin() as conn:
+        result = conn.execute(_INSERT_FILE_STMT, {
+            'user_id': user_id,
+            'filename': filename,
+            'requirements': requirements,
+            'test_cases': test_cases,
+            'project_type': project_type
+        })
         
         # Get the ID of the inserted row
         file_id = result.inserted_primary_key[0]
-        return file_id
+    return file_id
+
+
+def read_generation_request():
+    """
+    Read requirements, project type and provider from an upload, form or JSON body.
+    
+    Returns (requirements, project_type, ai_provider) and an error response, one of which is None.
+    """
+    requirements = None
+    project_type = 'Web'  # Default
+    is_multipart = request.mimetype == 'multipart/form-data'
+    
+    # Check if file was uploaded
+    if is_multipart and 'file' in request.files:
+        file = request.files['file']
+        if file and file.filename:
+            if not FileParser.allowed_file(file.filename, Config.ALLOWED_EXTENSIONS):
+                return None, (jsonify({'error': 'Invalid file type. Allowed: PDF, DOCX, TXT'}), 400)
+            
+            # Parse the upload in place; no temp file write/read/delete
+            extension = os.path.splitext(file.filename)[1]
+            requirements = FileParser.extract_text_from_stream(file.stream, extension)
+    
+    # Get form data or JSON data; the body is only ever parsed one way
+    if is_multipart:
+        if not requirements:
+            requirements = request.form.get('requirements', '').strip()
+        project_type = request.form.get('project_type', 'Web')
+        ai_provider = request.form.get('ai_provider', None)
+    else:
+        data = request.get_json(silent=True) or {}
+        if not requirements:
+            requirements = data.get('requirements', '').strip()
+        project_type = data.get('project_type', 'Web')
+        ai_provider = data.get('ai_provider', None)
+    
+    # Validate
+    if not requirements:
+        return None, (jsonify({'error': 'Requirements are required'}), 400)
+    
+    if project_type not in ['Web', 'Mobile', 'API', 'Desktop']:
+        project_type = 'Web'
+    
+    return (requirements, project_type, ai_provider), None
+
+
+def save_generation_result(user_id: int, requirements: str, project_type: str, result: dict) -> tuple:
+    """Save one generation result under a generated filename; returns (file_id, filename)."""
+    filename = _generated_filename(project_type)
+    
+    file_id = save_generated_file(
+        user_id, 
+        filename, 
+        requirements[:REQUIREMENTS_PREVIEW_CHARS],
+        result, 
+        project_type
+    )
+    return file_id, filename
 
 
 @generate_bp.route('/api/generate', methods=['POST'])
@@ -70,51 +174,10 @@ def generate_test_cases():
         return jsonify({'error': 'Unauthorized'}), 401
     
     try:
-        requirements = None
-        project_type = 'Web'  # Default
-        
-        # Check if file was uploaded
-        if 'file' in request.files:
-            file = request.files['file']
-            if file and file.filename:
-                if not FileParser.allowed_file(file.filename, Config.ALLOWED_EXTENSIONS):
-                    return jsonify({'error': 'Invalid file type. Allowed: PDF, DOCX, TXT'}), 400
-                
-                # Ensure upload folder exists
-                os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
-                
-                # Save file temporarily
-                filename = secure_filename(file.filename)
-                file_path = os.path.join(Config.UPLOAD_FOLDER, filename)
-                file.save(file_path)
-                
-                try:
-                    # Extract text from file
-                    requirements = FileParser.extract_text(file_path)
-                finally:
-                    # Clean up uploaded file
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
-        
-        # Get form data or JSON data
-        if request.content_type and 'multipart/form-data' in request.content_type:
-            if not requirements:
-                requirements = request.form.get('requirements', '').strip()
-            project_type = request.form.get('project_type', 'Web')
-            ai_provider = request.form.get('ai_provider', None)
-        else:
-            data = request.get_json() or {}
-            if not requirements:
-                requirements = data.get('requirements', '').strip()
-            project_type = data.get('project_type', 'Web')
-            ai_provider = data.get('ai_provider', None)
-        
-        # Validate
-        if not requirements:
-            return jsonify({'error': 'Requirements are required'}), 400
-        
-        if project_type not in ['Web', 'Mobile', 'API', 'Desktop']:
-            project_type = 'Web'
+        params, error = read_generation_request()
+        if error:
+            return error
+        requirements, project_type, ai_provider = params
         
         # Generate test cases with specified provider
         service = get_ai_service()
@@ -124,16 +187,7 @@ def generate_test_cases():
         result = service.generate_test_cases(requirements, project_type, ai_provider)
         
         # Save to database
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"test_cases_{project_type.lower()}_{timestamp}"
-        
-        file_id = save_generated_file(
-            user.id, 
-            filename, 
-            requirements[:1000],  # Store first 1000 chars of requirements
-            result, 
-            project_type
-        )
+        file_id, filename = save_generation_result(user.id, requirements, project_type, result)
         
         return jsonify({
             'success': True,
@@ -150,6 +204,276 @@ def generate_test_cases():
         return jsonify({'error': 'An error occurred during test case generation'}), 500
 
 
+def _set_generation_job(job_id: str, **values) -> None:
+    with engine.begin() as conn:
+        conn.execute(generation_jobs.update().where(generation_jobs.c.job_id == job_id).values(**values))
+
+
+def _run_generation_job(job_id: str, user_id: int, requirements: str, project_type: str, ai_provider: str) -> None:
+    """Worker-thread body for /api/generate/async; records the outcome on the job row."""
+    try:
+        _set_generation_job(job_id, status='running')
+        service = get_ai_service()
+        if not service:
+            raise RuntimeError('AI Service failed to initialize')
+        result = service.generate_test_cases(requirements, project_type, ai_provider)
+        file_id, filename = save_generation_result(user_id, requirements, project_type, result)
+        _set_generation_job(job_id, status='ended', file_id=file_id, filename=filename)
+    except Exception as e:
+        print(f"Generation job {job_id} error: {str(e)}")
+        _set_generation_job(job_id, status='failed', error='An error occurred during test case generation')
+
+
+@generate_bp.route('/api/generate/async', methods=['POST'])
+def generate_test_cases_async():
+    """
+    Queue a generation and answer 202 with a job id straight away.
+    
+    The AI call runs on a background thread; poll /api/generate/status/<job_id>
+    and fetch the saved file from /api/generate/<file_id> once it has ended.
+    """
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        params, error = read_generation_request()
+        if error:
+            return error
+        
+        job_id = secrets.token_urlsafe(16)
+        with engine.begin() as conn:
+            conn.execute(generation_jobs.insert().values(
+                user_id=user.id,
+                job_id=job_id,
+                status='queued'
+            ))
+        _generation_executor.submit(_run_generation_job, job_id, user.id, *params)
+        
+        return jsonify({'success': True, 'job_id': job_id, 'status': 'queued'}), 202
+        
+    except Exception as e:
+        print(f"Generation queue error: {str(e)}")
+        return jsonify({'error': 'An error occurred while queueing test case generation'}), 500
+
+
+@generate_bp.route('/api/generate/status/<job_id>', methods=['GET'])
+def get_generation_status(job_id):
+    """Report a queued generation's status, with its file once it has ended."""
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    with engine.connect() as conn:
+        stmt = select(generation_jobs).where(
+            (generation_jobs.c.job_id == job_id) &
+            (generation_jobs.c.user_id == user.id)
+        )
+        row = conn.execute(stmt).first()
+    
+    if not row:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    if row.status == 'ended':
+        return jsonify({'success': True, 'status': 'ended', 'file_id': row.file_id, 'filename': row.filename}), 200
+    if row.status == 'failed':
+        return jsonify({'success': False, 'status': 'failed', 'error': row.error}), 200
+    return jsonify({'success': True, 'job_id': job_id, 'status': row.status}), 202
+
+
+@generate_bp.route('/api/generate/stream', methods=['POST'])
+def stream_test_cases():
+    """
+    Generate test cases from JSON requirements, streamed as NDJSON.
+    
+    Each line is one test case, emitted as soon as the model has produced it.
+    The final line carries the saved file id and summary.
+    """
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    requirements = data.get('requirements', '').strip()
+    project_type = data.get('project_type', 'Web')
+    ai_provider = data.get('ai_provider', None)
+    
+    if not requirements:
+        return jsonify({'error': 'Requirements are required'}), 400
+    
+    if project_type not in ['Web', 'Mobile', 'API', 'Desktop']:
+        project_type = 'Web'
+    
+    service = get_ai_service()
+    if not service:
+        return jsonify({'error': 'AI Service failed to initialize'}), 500
+    
+    user_id = user.id
+    
+    def generate():
+        test_cases = []
+        for test_case in service.stream_test_cases(requirements, project_type, ai_provider):
+            test_cases.append(test_case)
+            yield json_dumps(test_case) + '\n'
+        
+        priorities = [tc.get('priority') for tc in test_cases]
+        summary = {
+            'total_test_cases': len(test_cases),
+            'high_priority': priorities.count('High'),
+            'medium_priority': priorities.count('Medium'),
+            'low_priority': priorities.count('Low')
+        }
+        
+        filename = _generated_filename(project_type)
+        file_id = save_generated_file(
+            user_id,
+            filename,
+            requirements[:REQUIREMENTS_PREVIEW_CHARS],
+            {'test_cases': test_cases, 'summary': summary},
+            project_type
+        )
+        yield json_dumps({'done': True, 'file_id': file_id, 'filename': filename, 'summary': summary}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def save_batch_results(user_id: int, jobs: list, results: list) -> list:
+    """Save each batch result as its own generated file, in one multi-row INSERT."""
+    rows = []
+    for index, ((requirements, project_type), result) in enumerate(zip(jobs, results), start=1):
+        rows.append({
+            'user_id': user_id,
+            'filename': f"{_generated_filename(project_type)}_{index}",
+            'requirements': requirements[:REQUIREMENTS_PREVIEW_CHARS],
+            'test_cases': result,
+            'project_type': project_type
+        })
+    
+    # executemany with RETURNING; ids come back in the same order as rows
+    with engine.begin() as conn:
+        stmt = generated_files.insert().returning(generated_files.c.id, sort_by_parameter_order=True)
+        file_ids = conn.execute(stmt, rows).scalars().all()
+    
+    return [
+        {
+            'file_id': file_id,
+            'filename': row['filename'],
+            'provider': result.get('provider', 'unknown'),
+            'error': result.get('error', '')
+        }
+        for file_id, row, result in zip(file_ids, rows, results)
+    ]
+
+
+@generate_bp.route('/api/generate/batch', methods=['POST'])
+def generate_test_cases_batch():
+    """
+    Generate test cases for several requirement sections at once.
+    
+    Anthropic jobs are submitted to the Message Batches API and answered with
+    202 and a batch id to poll. Other providers queue one /api/generate/async
+    job per section and answer 202 with their job ids, each polled through
+    /api/generate/status/<job_id>.
+    """
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    ai_provider = data.get('ai_provider') or Config.DEFAULT_AI_PROVIDER
+    
+    jobs = []
+    for job in data.get('jobs') or []:
+        requirements = (job.get('requirements') or '').strip()
+        project_type = job.get('project_type', 'Web')
+        if project_type not in ['Web', 'Mobile', 'API', 'Desktop']:
+            project_type = 'Web'
+        if requirements:
+            jobs.append((requirements, project_type))
+    
+    if not jobs:
+        return jsonify({'error': 'At least one job with requirements is required'}), 400
+    
+    if len(jobs) > MAX_BATCH_JOBS:
+        return jsonify({'error': f'A batch can contain at most {MAX_BATCH_JOBS} jobs'}), 400
+    
+    service = get_ai_service()
+    if not service:
+        return jsonify({'error': 'AI Service failed to initialize'}), 500
+    
+    try:
+        if ai_provider == 'anthropic' and service.anthropic_client:
+            batch_id = service.submit_test_cases_batch(jobs)
+            with engine.begin() as conn:
+                conn.execute(batch_jobs.insert().values(
+                    user_id=user.id,
+                    batch_id=batch_id,
+                    jobs=json_dumps(jobs),
+                    status='processing'
+                ))
+            return jsonify({'success': True, 'batch_id': batch_id, 'status': 'processing'}), 202
+        
+        # One provider call per section would outlast the worker timeout, so
+        # they run on the background executor like /api/generate/async
+        job_ids = [secrets.token_urlsafe(16) for _ in jobs]
+        with engine.begin() as conn:
+            conn.execute(generation_jobs.insert(), [
+                {'user_id': user.id, 'job_id': job_id, 'status': 'queued'}
+                for job_id in job_ids
+            ])
+        for job_id, (requirements, project_type) in zip(job_ids, jobs):
+            _generation_executor.submit(_run_generation_job, job_id, user.id, requirements, project_type, ai_provider)
+        
+        return jsonify({'success': True, 'job_ids': job_ids, 'status': 'queued'}), 202
+        
+    except Exception as e:
+        print(f"Batch generation error: {str(e)}")
+        return jsonify({'error': 'An error occurred during test case generation'}), 500
+
+
+@generate_bp.route('/api/generate/batch/<batch_id>', methods=['GET'])
+def get_batch_status(batch_id):
+    """Poll a submitted batch; once it has ended its results are saved as generated files."""
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    with engine.connect() as conn:
+        stmt = select(batch_jobs).where(
+            (batch_jobs.c.batch_id == batch_id) &
+            (batch_jobs.c.user_id == user.id)
+        )
+        row = conn.execute(stmt).first()
+    
+    if not row:
+        return jsonify({'error': 'Batch not found'}), 404
+    
+    if row.status == 'ended':
+        return jsonify({'success': True, 'status': 'ended', 'files': json_loads(row.file_ids)}), 200
+    
+    service = get_ai_service()
+    if not service:
+        return jsonify({'error': 'AI Service failed to initialize'}), 500
+    
+    try:
+        jobs = [tuple(job) for job in json_loads(row.jobs)]
+        results = service.collect_test_cases_batch(batch_id, jobs)
+        if results is None:
+            return jsonify({'success': True, 'batch_id': batch_id, 'status': 'processing'}), 202
+        
+        files = save_batch_results(user.id, jobs, results)
+        with engine.begin() as conn:
+            conn.execute(batch_jobs.update().where(batch_jobs.c.id == row.id).values(
+                status='ended',
+                file_ids=json_dumps(files)
+            ))
+        return jsonify({'success': True, 'status': 'ended', 'files': files}), 200
+        
+    except Exception as e:
+        print(f"Batch collection error: {str(e)}")
+        return jsonify({'error': 'An error occurred while collecting batch results'}), 500
+
+
 @generate_bp.route('/api/generate/<int:file_id>', methods=['GET'])
 def get_generated_file(file_id):
     """Get a specific generated file."""
@@ -158,17 +482,13 @@ def get_generated_file(file_id):
         return jsonify({'error': 'Unauthorized'}), 401
     
     with engine.connect() as conn:
-        stmt = select(generated_files).where(
-            (generated_files.c.id == file_id) & 
-            (generated_files.c.user_id == user.id)
-        )
-        result = conn.execute(stmt)
+        result = conn.execute(_GET_FILE_STMT, {'file_id': file_id, 'user_id': user.id})
         row = result.first()
     
     if not row:
         return jsonify({'error': 'File not found'}), 404
     
-    test_cases = json.loads(row.test_cases)
+    test_cases = row.test_cases
     
     return jsonify({
         'id': row.id,
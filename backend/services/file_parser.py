@@ -2,21 +2,35 @@ import os
 from PyPDF2 import PdfReader
 from docx import Document
 
+# Optional PyMuPDF import (much faster PDF text extraction; PyPDF2 is the fallback)
+try:
+    import fitz
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
 
 class FileParser:
     """Service for extracting text from uploaded files."""
     
     @staticmethod
-    def extract_text(file_path: str) -> str:
+    def extract_text(file_path, extension: str = None) -> str:
         """
         Extract text content from a file based on its extension.
         
         Args:
-            file_path: Path to the file
+            file_path: Path to the file, or an open binary file object
+            extension: Extension including the dot; required for file objects,
+                taken from the path otherwise
             
         Returns:
             Extracted text content
         """
+        if hasattr(file_path, 'read'):
+            if not extension:
+                raise ValueError("An extension is required when extracting from a file object")
+            return FileParser.extract_text_from_stream(file_path, extension)
+        
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
         
@@ -32,12 +46,49 @@ class FileParser:
             raise ValueError(f"Unsupported file type: {extension}")
     
     @staticmethod
-    def _extract_from_pdf(file_path: str) -> str:
-        """Extract text from a PDF file."""
+    def extract_text_from_stream(stream, extension: str) -> str:
+        """
+        Extract text content from an open binary file object.
+        
+        Lets callers parse an upload in place instead of saving it to disk first.
+        
+        Args:
+            stream: Readable, seekable binary file object
+            extension: File extension including the dot (e.g. '.pdf')
+            
+        Returns:
+            Extracted text content
+        """
+        extension = extension.lower()
+        
+        if extension == '.pdf':
+            return FileParser._extract_from_pdf(stream)
+        elif extension == '.docx':
+            return FileParser._extract_from_docx(stream)
+        elif extension == '.txt':
+            return FileParser._decode_txt(stream.read())
+        else:
+            raise ValueError(f"Unsupported file type: {extension}")
+    
+    @staticmethod
+    def _extract_from_pdf(file_path) -> str:
+        """Extract text from a PDF file (path or binary file object)."""
         try:
-            reader = PdfReader(file_path)
             text_parts = []
             
+            if PYMUPDF_AVAILABLE:
+                if isinstance(file_path, (str, os.PathLike)):
+                    doc = fitz.open(file_path)
+                else:
+                    doc = fitz.open(stream=file_path.read(), filetype='pdf')
+                with doc:
+                    for page in doc:
+                        page_text = page.get_text('text')
+                        if page_text:
+                            text_parts.append(page_text)
+                return '\n'.join(text_parts)
+            
+            reader = PdfReader(file_path)
             for page in reader.pages:
                 page_text = page.extract_text()
                 if page_text:
@@ -48,22 +99,24 @@ class FileParser:
             raise Exception(f"Error reading PDF: {str(e)}")
     
     @staticmethod
-    def _extract_from_docx(file_path: str) -> str:
-        """Extract text from a DOCX file."""
+    def _extract_from_docx(file_path) -> str:
+        """Extract text from a DOCX file (path or binary file object)."""
         try:
             doc = Document(file_path)
             text_parts = []
             
+            # paragraph.text rebuilds the string from its runs, so read it once
             for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    text_parts.append(paragraph.text)
+                paragraph_text = paragraph.text
+                if paragraph_text.strip():
+                    text_parts.append(paragraph_text)
             
             # Also extract text from tables
             for table in doc.tables:
                 for row in table.rows:
-                    row_text = ' | '.join(cell.text.strip() for cell in row.cells if cell.text.strip())
-                    if row_text:
-                        text_parts.append(row_text)
+                    cell_texts = [text for text in (cell.text.strip() for cell in row.cells) if text]
+                    if cell_texts:
+                        text_parts.append(' | '.join(cell_texts))
             
             return '\n'.join(text_parts)
         except Exception as e:
@@ -73,17 +126,24 @@ class FileParser:
     def _extract_from_txt(file_path: str) -> str:
         """Extract text from a TXT file."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        except UnicodeDecodeError:
-            # Try with different encoding
-            with open(file_path, 'r', encoding='latin-1') as f:
-                return f.read()
+            with open(file_path, 'rb') as f:
+                data = f.read()
         except Exception as e:
             raise Exception(f"Error reading TXT: {str(e)}")
+        return FileParser._decode_txt(data)
+    
+    @staticmethod
+    def _decode_txt(data: bytes) -> str:
+        """Decode TXT bytes as UTF-8, falling back to latin-1 without re-reading the file."""
+        try:
+            text = data.decode('utf-8')
+        except UnicodeDecodeError:
+            text = data.decode('latin-1')
+        # Same newline translation as opening the file in text mode
+        return text.replace('\r\n', '\n').replace('\r', '\n')
     
     @staticmethod
-    def allowed_file(filename: str, allowed_extensions: set) -> bool:
+    def allowed_file(filename: str, allowed_extensions: frozenset) -> bool:
         """Check if a file has an allowed extension."""
-        return '.' in filename and \
-               filename.rsplit('.', 1)[1].lower() in allowed_extensions
+        dot = filename.rfind('.')
+        return dot != -1 and filename[dot + 1:].lower() in allowed_extensions
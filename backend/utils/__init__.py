@@ -1,2 +1,2 @@
 # Utils package
-from .helpers import validate_email, sanitize_input
+from .helpers import validate_email, sanitize_input, save_stream_to_tempfile, SpooledUploadRequest, get_bcrypt_salt, json_dumps, json_loads, encode_json_blob, decode_json_blob, ORJSONProvider
@@ -1,5 +1,32 @@
+import os
 import re
+import json
 import html
+import queue
+import shutil
+import tempfile
+import threading
+import bcrypt
+from flask import Request
+from flask.json.provider import JSONProvider, DefaultJSONProvider
+
+# Optional orjson import (faster encoding of large JSON responses)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Optional zstandard import (compressed JSON blobs in the database)
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\Z')
 
 
 def validate_email(email: str) -> bool:
@@ -7,8 +34,7 @@ def validate_email(email: str) -> bool:
     if not email:
         return False
     
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return bool(re.match(pattern, email))
+    return _EMAIL_RE.match(email) is not None
 
 
 def sanitize_input(text: str) -> str:
@@ -22,16 +48,17 @@ def sanitize_input(text: str) -> str:
     return sanitized.strip()
 
 
+_SIZE_UNITS = (('KB', 1 << 10), ('MB', 1 << 20), ('GB', 1 << 30))
+
+
 def format_file_size(size_bytes: int) -> str:
     """Format file size in human-readable format."""
-    if size_bytes < 1024:
+    # Each unit is 10 more bits, so the bit length picks the unit directly
+    index = min(max(size_bytes.bit_length() - 1, 0) // 10, len(_SIZE_UNITS))
+    if index == 0:
         return f"{size_bytes} B"
-    elif size_bytes < 1024 * 1024:
-        return f"{size_bytes / 1024:.1f} KB"
-    elif size_bytes < 1024 * 1024 * 1024:
-        return f"{size_bytes / (1024 * 1024):.1f} MB"
-    else:
-        return f"{size_bytes / (1024 * 1024 * 1024):.1f} GB"
+    unit, scale = _SIZE_UNITS[index - 1]
+    return f"{size_bytes / scale:.1f} {unit}"
 
 
 def truncate_text(text: str, max_length: int = 100) -> str:
@@ -40,3 +67,137 @@ def truncate_text(text: str, max_length: int = 100) -> str:
         return text
     
     return text[:max_length - 3] + '...'
+
+
+def save_stream_to_tempfile(stream, suffix: str, folder: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Copy a binary stream to a new temporary file in fixed-size blocks.
+    
+    Args:
+        stream: Readable binary stream (e.g. request.stream)
+        suffix: File extension to keep, such as '.pdf'
+        folder: Directory to create the file in
+        chunk_size: Bytes copied per read
+        
+    Returns:
+        Path of the written file; the caller is responsible for removing it
+    """
+    with tempfile.NamedTemporaryFile(dir=folder, suffix=suffix, delete=False) as tmp:
+        shutil.copyfileobj(stream, tmp, chunk_size)
+        return tmp.name
+
+
+class SpooledUploadRequest(Request):
+    """
+    Request class that buffers multipart file parts in memory up to 1 MiB.
+    
+    Install with app.request_class = SpooledUploadRequest. Werkzeug's default sends any
+    upload over 500 KB to an unnamed temp file; here it only spills to disk past the limit.
+    """
+    
+    UPLOAD_SPOOL_SIZE = 1024 * 1024
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=self.UPLOAD_SPOOL_SIZE, mode='rb+')
+
+
+# Pre-generated bcrypt salts, refilled by a background thread so signups don't
+# read the OS CSPRNG on the request path. Every salt is still used only once.
+SALT_POOL_SIZE = 1024
+_salt_pool = queue.Queue(maxsize=SALT_POOL_SIZE)
+_salt_pool_rounds = None
+_salt_pool_lock = threading.Lock()
+
+
+def _reset_salt_pool() -> None:
+    # A forked worker must not reuse salts already drawn by its parent, and the
+    # refill thread does not survive the fork anyway
+    global _salt_pool, _salt_pool_rounds
+    _salt_pool = queue.Queue(maxsize=SALT_POOL_SIZE)
+    _salt_pool_rounds = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_salt_pool)
+
+
+def _fill_salt_pool(rounds: int) -> None:
+    pool = _salt_pool
+    while True:
+        pool.put(bcrypt.gensalt(rounds))  # blocks while the pool is full
+
+
+def get_bcrypt_salt(rounds: int) -> bytes:
+    """
+    Return a fresh bcrypt salt for the given work factor, drawn from the pool.
+    
+    The refill thread starts on first use. Falls back to bcrypt.gensalt() when the
+    pool is empty or was started for a different work factor.
+    """
+    global _salt_pool_rounds
+    if _salt_pool_rounds is None:
+        with _salt_pool_lock:
+            if _salt_pool_rounds is None:
+                _salt_pool_rounds = rounds
+                threading.Thread(target=_fill_salt_pool, args=(rounds,), daemon=True, name='salt-pool').start()
+    
+    if rounds == _salt_pool_rounds:
+        try:
+            return _salt_pool.get_nowait()
+        except queue.Empty:
+            pass
+    return bcrypt.gensalt(rounds)
+
+
+def json_dumps(obj) -> str:
+    """Serialize to a compact JSON string, using orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, separators=(',', ':'))
+
+
+def json_loads(s):
+    """Parse a JSON str or bytes, using orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(s)
+    return json.loads(s)
+
+
+def encode_json_blob(obj) -> bytes:
+    """Serialize to JSON bytes for a binary column, zstd-compressed when zstandard is installed."""
+    data = orjson.dumps(obj) if ORJSON_AVAILABLE else json_dumps(obj).encode('utf-8')
+    if ZSTD_AVAILABLE:
+        return zstandard.compress(data, 3)
+    return data
+
+
+def decode_json_blob(data):
+    """Parse a value written by encode_json_blob, or a legacy plain JSON string."""
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    if isinstance(data, bytes) and data.startswith(_ZSTD_MAGIC):
+        data = zstandard.decompress(data)
+    return json_loads(data)
+
+
+class ORJSONProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson; install with app.json = ORJSONProvider(app).
+    
+    Types orjson can't encode natively fall back to Flask's default conversions, as do
+    datetimes, so they keep Flask's HTTP-date format. Keys keep insertion order rather
+    than being sorted.
+    """
+    
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=DefaultJSONProvider.default, option=orjson.OPT_PASSTHROUGH_DATETIME).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=DefaultJSONProvider.default, option=orjson.OPT_PASSTHROUGH_DATETIME),
+            mimetype='application/json'
+        )